@@ -10,12 +10,14 @@ type Config struct {
 	OllamaModel        string
 	OllamaTimeout      int // seconds
 	OllamaNumCtx       int
+	OllamaBatchSize    int
 	GmailMaxResults    int
 	GmailLookbackHours int
 	EmailBodyTrunc     int
 	LogRetentionDays   int
 	PollInterval       int // seconds
 	MinPollInterval    int // seconds
+	PollWorkers        int
 	HistoryMaxLimit    int
 	DebugLogging       bool
 	CredentialsFile    string
@@ -28,12 +30,14 @@ func loadConfig() Config {
 		OllamaModel:        getEnv("OLLAMA_MODEL", "qwen3.5:4b-q4_K_M"),
 		OllamaTimeout:      getEnvInt("OLLAMA_TIMEOUT", 600),
 		OllamaNumCtx:       getEnvInt("OLLAMA_NUM_CTX", 4096),
+		OllamaBatchSize:    getEnvInt("OLLAMA_BATCH_SIZE", 5),
 		GmailMaxResults:    getEnvInt("GMAIL_MAX_RESULTS", 50),
 		GmailLookbackHours: getEnvInt("GMAIL_LOOKBACK_HOURS", 24),
 		EmailBodyTrunc:     getEnvInt("EMAIL_BODY_TRUNCATION", 3000),
 		LogRetentionDays:   getEnvInt("LOG_RETENTION_DAYS", 30),
 		PollInterval:       getEnvInt("POLL_INTERVAL", 300),
 		MinPollInterval:    getEnvInt("MIN_POLL_INTERVAL", 30),
+		PollWorkers:        getEnvInt("POLL_WORKERS", 4),
 		HistoryMaxLimit:    getEnvInt("HISTORY_MAX_LIMIT", 500),
 		DebugLogging:       getEnv("DEBUG_LOGGING", "0") == "1",
 		CredentialsFile:    getEnv("CREDENTIALS_FILE", "/credentials/credentials.json"),
@@ -15,6 +15,7 @@ type Account struct {
 	AddedAt         string
 	LastScanAt      sql.NullString
 	Active          int64
+	LastHistoryID   string
 }
 
 type AccountRetention struct {
@@ -61,6 +62,12 @@ type LabelRetention struct {
 	Days      int64
 }
 
+type LlmCache struct {
+	Key       string
+	Response  string
+	CreatedAt string
+}
+
 type LlmDebug struct {
 	ID           int64
 	Timestamp    string
@@ -102,6 +109,7 @@ type Prompt struct {
 	SortOrder      int64
 	StopProcessing int64
 	AccountID      sql.NullInt64
+	Prefilter      string
 }
 
 type PromptSuggestion struct {
@@ -20,7 +20,7 @@ SELECT key, value FROM settings;
 -- ============================================================
 
 -- name: ListAccounts :many
-SELECT id, email, credentials_json, added_at, last_scan_at, active
+SELECT id, email, credentials_json, added_at, last_scan_at, active, last_history_id
 FROM accounts
 ORDER BY added_at DESC;
 
@@ -30,7 +30,7 @@ FROM accounts
 ORDER BY added_at DESC;
 
 -- name: GetAccount :one
-SELECT id, email, credentials_json, added_at, last_scan_at, active
+SELECT id, email, credentials_json, added_at, last_scan_at, active, last_history_id
 FROM accounts WHERE id = ? LIMIT 1;
 
 -- name: UpsertAccount :one
@@ -42,6 +42,9 @@ RETURNING id;
 -- name: UpdateAccountCredentials :exec
 UPDATE accounts SET credentials_json = ? WHERE id = ?;
 
+-- name: UpdateAccountHistoryID :exec
+UPDATE accounts SET last_history_id = ? WHERE id = ?;
+
 -- name: UpdateLastScan :exec
 UPDATE accounts SET last_scan_at = strftime('%Y-%m-%d %H:%M:%S', 'now') WHERE id = ?;
 
@@ -65,14 +68,14 @@ SELECT id FROM accounts WHERE email = ? LIMIT 1;
 -- name: ListPrompts :many
 SELECT id, name, instructions, label_name, active, created_at,
        action_archive, action_spam, action_trash, action_mark_read,
-       sort_order, stop_processing, account_id
+       sort_order, stop_processing, account_id, prefilter
 FROM prompts
 ORDER BY sort_order ASC, id ASC;
 
 -- name: ListPromptsByAccount :many
 SELECT id, name, instructions, label_name, active, created_at,
        action_archive, action_spam, action_trash, action_mark_read,
-       sort_order, stop_processing, account_id
+       sort_order, stop_processing, account_id, prefilter
 FROM prompts
 WHERE account_id = ? OR account_id IS NULL
 ORDER BY sort_order ASC, id ASC;
@@ -80,7 +83,7 @@ ORDER BY sort_order ASC, id ASC;
 -- name: ListActivePrompts :many
 SELECT id, name, instructions, label_name, active, created_at,
        action_archive, action_spam, action_trash, action_mark_read,
-       sort_order, stop_processing, account_id
+       sort_order, stop_processing, account_id, prefilter
 FROM prompts
 WHERE active = 1
 ORDER BY sort_order ASC, id ASC;
@@ -88,7 +91,7 @@ ORDER BY sort_order ASC, id ASC;
 -- name: ListActivePromptsByAccount :many
 SELECT id, name, instructions, label_name, active, created_at,
        action_archive, action_spam, action_trash, action_mark_read,
-       sort_order, stop_processing, account_id
+       sort_order, stop_processing, account_id, prefilter
 FROM prompts
 WHERE active = 1 AND (account_id = ? OR account_id IS NULL)
 ORDER BY sort_order ASC, id ASC;
@@ -96,15 +99,15 @@ ORDER BY sort_order ASC, id ASC;
 -- name: GetPrompt :one
 SELECT id, name, instructions, label_name, active, created_at,
        action_archive, action_spam, action_trash, action_mark_read,
-       sort_order, stop_processing, account_id
+       sort_order, stop_processing, account_id, prefilter
 FROM prompts WHERE id = ? LIMIT 1;
 
 -- name: MaxPromptSortOrder :one
 SELECT COALESCE(MAX(sort_order), -1) FROM prompts;
 
 -- name: CreatePrompt :one
-INSERT INTO prompts (name, instructions, label_name, active, action_archive, action_spam, action_trash, action_mark_read, sort_order, stop_processing, account_id)
-VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+INSERT INTO prompts (name, instructions, label_name, active, action_archive, action_spam, action_trash, action_mark_read, sort_order, stop_processing, account_id, prefilter)
+VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?)
 RETURNING id;
 
 -- name: UpdatePrompt :exec
@@ -117,7 +120,8 @@ UPDATE prompts SET
     action_trash = ?,
     action_mark_read = ?,
     stop_processing = ?,
-    account_id = ?
+    account_id = ?,
+    prefilter = ?
 WHERE id = ?;
 
 -- name: TogglePrompt :one
@@ -161,7 +165,7 @@ WHERE processed_at IS NOT NULL AND processed_at < ?;
 -- ============================================================
 
 -- name: AddLog :exec
-INSERT INTO logs (level, message) VALUES (?, ?);
+INSERT INTO logs (timestamp, level, message) VALUES (?, ?, ?);
 
 -- name: GetLogs :many
 SELECT id, timestamp, level, message
@@ -175,6 +179,13 @@ FROM logs
 WHERE timestamp >= ? AND timestamp <= ?
 ORDER BY id ASC;
 
+-- name: GetLogsSince :many
+SELECT id, timestamp, level, message
+FROM logs
+WHERE id > ?
+ORDER BY id ASC
+LIMIT ?;
+
 -- name: TrimLogs :exec
 DELETE FROM logs WHERE timestamp < ?;
 
@@ -399,3 +410,14 @@ SELECT version FROM schema_version LIMIT 1;
 
 -- name: SetSchemaVersion :exec
 UPDATE schema_version SET version = ?;
+
+-- ============================================================
+-- LLM Cache
+-- ============================================================
+
+-- name: PutLlmCache :exec
+INSERT INTO llm_cache (key, response) VALUES (?, ?)
+ON CONFLICT(key) DO UPDATE SET response = excluded.response, created_at = excluded.created_at;
+
+-- name: TrimLlmCache :exec
+DELETE FROM llm_cache WHERE created_at < ?;
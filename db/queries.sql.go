@@ -116,19 +116,20 @@ func (q *Queries) AddLlmDebug(ctx context.Context, arg AddLlmDebugParams) error
 
 const addLog = `-- name: AddLog :exec
 
-INSERT INTO logs (level, message) VALUES (?, ?)
+INSERT INTO logs (timestamp, level, message) VALUES (?, ?, ?)
 `
 
 type AddLogParams struct {
-	Level   string
-	Message string
+	Timestamp string
+	Level     string
+	Message   string
 }
 
 // ============================================================
 // Logs
 // ============================================================
 func (q *Queries) AddLog(ctx context.Context, arg AddLogParams) error {
-	_, err := q.db.ExecContext(ctx, addLog, arg.Level, arg.Message)
+	_, err := q.db.ExecContext(ctx, addLog, arg.Timestamp, arg.Level, arg.Message)
 	return err
 }
 
@@ -186,8 +187,8 @@ func (q *Queries) CreateAccountPlaceholder(ctx context.Context, email string) (i
 }
 
 const createPrompt = `-- name: CreatePrompt :one
-INSERT INTO prompts (name, instructions, label_name, active, action_archive, action_spam, action_trash, action_mark_read, sort_order, stop_processing, account_id)
-VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+INSERT INTO prompts (name, instructions, label_name, active, action_archive, action_spam, action_trash, action_mark_read, sort_order, stop_processing, account_id, prefilter)
+VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?)
 RETURNING id
 `
 
@@ -202,6 +203,7 @@ type CreatePromptParams struct {
 	SortOrder      int64
 	StopProcessing int64
 	AccountID      sql.NullInt64
+	Prefilter      string
 }
 
 func (q *Queries) CreatePrompt(ctx context.Context, arg CreatePromptParams) (int64, error) {
@@ -216,6 +218,7 @@ func (q *Queries) CreatePrompt(ctx context.Context, arg CreatePromptParams) (int
 		arg.SortOrder,
 		arg.StopProcessing,
 		arg.AccountID,
+		arg.Prefilter,
 	)
 	var id int64
 	err := row.Scan(&id)
@@ -375,7 +378,7 @@ func (q *Queries) FinalizePromptSuggestion(ctx context.Context, arg FinalizeProm
 }
 
 const getAccount = `-- name: GetAccount :one
-SELECT id, email, credentials_json, added_at, last_scan_at, active
+SELECT id, email, credentials_json, added_at, last_scan_at, active, last_history_id
 FROM accounts WHERE id = ? LIMIT 1
 `
 
@@ -389,6 +392,7 @@ func (q *Queries) GetAccount(ctx context.Context, id int64) (Account, error) {
 		&i.AddedAt,
 		&i.LastScanAt,
 		&i.Active,
+		&i.LastHistoryID,
 	)
 	return i, err
 }
@@ -864,6 +868,47 @@ func (q *Queries) GetLogsRange(ctx context.Context, arg GetLogsRangeParams) ([]L
 	return items, nil
 }
 
+const getLogsSince = `-- name: GetLogsSince :many
+SELECT id, timestamp, level, message
+FROM logs
+WHERE id > ?
+ORDER BY id ASC
+LIMIT ?
+`
+
+type GetLogsSinceParams struct {
+	ID    int64
+	Limit int64
+}
+
+func (q *Queries) GetLogsSince(ctx context.Context, arg GetLogsSinceParams) ([]Log, error) {
+	rows, err := q.db.QueryContext(ctx, getLogsSince, arg.ID, arg.Limit)
+	if err != nil {
+		return nil, err
+	}
+	defer rows.Close()
+	var items []Log
+	for rows.Next() {
+		var i Log
+		if err := rows.Scan(
+			&i.ID,
+			&i.Timestamp,
+			&i.Level,
+			&i.Message,
+		); err != nil {
+			return nil, err
+		}
+		items = append(items, i)
+	}
+	if err := rows.Close(); err != nil {
+		return nil, err
+	}
+	if err := rows.Err(); err != nil {
+		return nil, err
+	}
+	return items, nil
+}
+
 const getProcessedMessageIDs = `-- name: GetProcessedMessageIDs :many
 
 SELECT message_id FROM processed_emails
@@ -904,7 +949,7 @@ func (q *Queries) GetProcessedMessageIDs(ctx context.Context, arg GetProcessedMe
 const getPrompt = `-- name: GetPrompt :one
 SELECT id, name, instructions, label_name, active, created_at,
        action_archive, action_spam, action_trash, action_mark_read,
-       sort_order, stop_processing, account_id
+       sort_order, stop_processing, account_id, prefilter
 FROM prompts WHERE id = ? LIMIT 1
 `
 
@@ -925,6 +970,7 @@ func (q *Queries) GetPrompt(ctx context.Context, id int64) (Prompt, error) {
 		&i.SortOrder,
 		&i.StopProcessing,
 		&i.AccountID,
+		&i.Prefilter,
 	)
 	return i, err
 }
@@ -1124,7 +1170,7 @@ func (q *Queries) LabelRetentionExists(ctx context.Context, arg LabelRetentionEx
 
 const listAccounts = `-- name: ListAccounts :many
 
-SELECT id, email, credentials_json, added_at, last_scan_at, active
+SELECT id, email, credentials_json, added_at, last_scan_at, active, last_history_id
 FROM accounts
 ORDER BY added_at DESC
 `
@@ -1148,6 +1194,7 @@ func (q *Queries) ListAccounts(ctx context.Context) ([]Account, error) {
 			&i.AddedAt,
 			&i.LastScanAt,
 			&i.Active,
+			&i.LastHistoryID,
 		); err != nil {
 			return nil, err
 		}
@@ -1208,7 +1255,7 @@ func (q *Queries) ListAccountsSafe(ctx context.Context) ([]ListAccountsSafeRow,
 const listActivePrompts = `-- name: ListActivePrompts :many
 SELECT id, name, instructions, label_name, active, created_at,
        action_archive, action_spam, action_trash, action_mark_read,
-       sort_order, stop_processing, account_id
+       sort_order, stop_processing, account_id, prefilter
 FROM prompts
 WHERE active = 1
 ORDER BY sort_order ASC, id ASC
@@ -1237,6 +1284,7 @@ func (q *Queries) ListActivePrompts(ctx context.Context) ([]Prompt, error) {
 			&i.SortOrder,
 			&i.StopProcessing,
 			&i.AccountID,
+			&i.Prefilter,
 		); err != nil {
 			return nil, err
 		}
@@ -1254,7 +1302,7 @@ func (q *Queries) ListActivePrompts(ctx context.Context) ([]Prompt, error) {
 const listActivePromptsByAccount = `-- name: ListActivePromptsByAccount :many
 SELECT id, name, instructions, label_name, active, created_at,
        action_archive, action_spam, action_trash, action_mark_read,
-       sort_order, stop_processing, account_id
+       sort_order, stop_processing, account_id, prefilter
 FROM prompts
 WHERE active = 1 AND (account_id = ? OR account_id IS NULL)
 ORDER BY sort_order ASC, id ASC
@@ -1283,6 +1331,7 @@ func (q *Queries) ListActivePromptsByAccount(ctx context.Context, accountID sql.
 			&i.SortOrder,
 			&i.StopProcessing,
 			&i.AccountID,
+			&i.Prefilter,
 		); err != nil {
 			return nil, err
 		}
@@ -1350,7 +1399,7 @@ const listPrompts = `-- name: ListPrompts :many
 
 SELECT id, name, instructions, label_name, active, created_at,
        action_archive, action_spam, action_trash, action_mark_read,
-       sort_order, stop_processing, account_id
+       sort_order, stop_processing, account_id, prefilter
 FROM prompts
 ORDER BY sort_order ASC, id ASC
 `
@@ -1381,6 +1430,7 @@ func (q *Queries) ListPrompts(ctx context.Context) ([]Prompt, error) {
 			&i.SortOrder,
 			&i.StopProcessing,
 			&i.AccountID,
+			&i.Prefilter,
 		); err != nil {
 			return nil, err
 		}
@@ -1398,7 +1448,7 @@ func (q *Queries) ListPrompts(ctx context.Context) ([]Prompt, error) {
 const listPromptsByAccount = `-- name: ListPromptsByAccount :many
 SELECT id, name, instructions, label_name, active, created_at,
        action_archive, action_spam, action_trash, action_mark_read,
-       sort_order, stop_processing, account_id
+       sort_order, stop_processing, account_id, prefilter
 FROM prompts
 WHERE account_id = ? OR account_id IS NULL
 ORDER BY sort_order ASC, id ASC
@@ -1427,6 +1477,7 @@ func (q *Queries) ListPromptsByAccount(ctx context.Context, accountID sql.NullIn
 			&i.SortOrder,
 			&i.StopProcessing,
 			&i.AccountID,
+			&i.Prefilter,
 		); err != nil {
 			return nil, err
 		}
@@ -1497,6 +1548,25 @@ func (q *Queries) PromptExistsGlobal(ctx context.Context, name string) (int64, e
 	return exists_val, err
 }
 
+const putLlmCache = `-- name: PutLlmCache :exec
+
+INSERT INTO llm_cache (key, response) VALUES (?, ?)
+ON CONFLICT(key) DO UPDATE SET response = excluded.response, created_at = excluded.created_at
+`
+
+type PutLlmCacheParams struct {
+	Key      string
+	Response string
+}
+
+// ============================================================
+// LLM Cache
+// ============================================================
+func (q *Queries) PutLlmCache(ctx context.Context, arg PutLlmCacheParams) error {
+	_, err := q.db.ExecContext(ctx, putLlmCache, arg.Key, arg.Response)
+	return err
+}
+
 const seedSetting = `-- name: SeedSetting :exec
 INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)
 `
@@ -1581,6 +1651,15 @@ func (q *Queries) TrimHistory(ctx context.Context, timestamp string) error {
 	return err
 }
 
+const trimLlmCache = `-- name: TrimLlmCache :exec
+DELETE FROM llm_cache WHERE created_at < ?
+`
+
+func (q *Queries) TrimLlmCache(ctx context.Context, createdAt string) error {
+	_, err := q.db.ExecContext(ctx, trimLlmCache, createdAt)
+	return err
+}
+
 const trimLlmDebug = `-- name: TrimLlmDebug :exec
 DELETE FROM llm_debug WHERE id NOT IN (SELECT id FROM llm_debug ORDER BY id DESC LIMIT 3)
 `
@@ -1623,6 +1702,20 @@ func (q *Queries) UpdateAccountCredentials(ctx context.Context, arg UpdateAccoun
 	return err
 }
 
+const updateAccountHistoryID = `-- name: UpdateAccountHistoryID :exec
+UPDATE accounts SET last_history_id = ? WHERE id = ?
+`
+
+type UpdateAccountHistoryIDParams struct {
+	LastHistoryID string
+	ID            int64
+}
+
+func (q *Queries) UpdateAccountHistoryID(ctx context.Context, arg UpdateAccountHistoryIDParams) error {
+	_, err := q.db.ExecContext(ctx, updateAccountHistoryID, arg.LastHistoryID, arg.ID)
+	return err
+}
+
 const updateLastScan = `-- name: UpdateLastScan :exec
 UPDATE accounts SET last_scan_at = strftime('%Y-%m-%d %H:%M:%S', 'now') WHERE id = ?
 `
@@ -1642,7 +1735,8 @@ UPDATE prompts SET
     action_trash = ?,
     action_mark_read = ?,
     stop_processing = ?,
-    account_id = ?
+    account_id = ?,
+    prefilter = ?
 WHERE id = ?
 `
 
@@ -1656,6 +1750,7 @@ type UpdatePromptParams struct {
 	ActionMarkRead int64
 	StopProcessing int64
 	AccountID      sql.NullInt64
+	Prefilter      string
 	ID             int64
 }
 
@@ -1670,6 +1765,7 @@ func (q *Queries) UpdatePrompt(ctx context.Context, arg UpdatePromptParams) erro
 		arg.ActionMarkRead,
 		arg.StopProcessing,
 		arg.AccountID,
+		arg.Prefilter,
 		arg.ID,
 	)
 	return err
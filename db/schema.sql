@@ -4,7 +4,8 @@ CREATE TABLE IF NOT EXISTS accounts (
     credentials_json TEXT NOT NULL DEFAULT '',
     added_at         TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
     last_scan_at     TEXT,
-    active           INTEGER NOT NULL DEFAULT 1
+    active           INTEGER NOT NULL DEFAULT 1,
+    last_history_id  TEXT NOT NULL DEFAULT ''
 );
 
 CREATE TABLE IF NOT EXISTS prompts (
@@ -20,7 +21,8 @@ CREATE TABLE IF NOT EXISTS prompts (
     action_mark_read INTEGER NOT NULL DEFAULT 0,
     sort_order       INTEGER NOT NULL DEFAULT 0,
     stop_processing  INTEGER NOT NULL DEFAULT 0,
-    account_id       INTEGER
+    account_id       INTEGER,
+    prefilter        TEXT NOT NULL DEFAULT ''
 );
 
 CREATE TABLE IF NOT EXISTS settings (
@@ -36,6 +38,8 @@ CREATE TABLE IF NOT EXISTS processed_emails (
     UNIQUE(account_id, message_id)
 );
 
+CREATE INDEX IF NOT EXISTS idx_processed_emails_processed_at ON processed_emails(processed_at);
+
 CREATE TABLE IF NOT EXISTS logs (
     id        INTEGER PRIMARY KEY AUTOINCREMENT,
     timestamp TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
@@ -43,6 +47,8 @@ CREATE TABLE IF NOT EXISTS logs (
     message   TEXT NOT NULL
 );
 
+CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp);
+
 CREATE TABLE IF NOT EXISTS categorization_history (
     id            INTEGER PRIMARY KEY AUTOINCREMENT,
     timestamp     TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
@@ -58,6 +64,11 @@ CREATE TABLE IF NOT EXISTS categorization_history (
     llm_response  TEXT NOT NULL DEFAULT ''
 );
 
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON categorization_history(timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_account ON categorization_history(account_id);
+CREATE INDEX IF NOT EXISTS idx_history_prompt ON categorization_history(prompt_id);
+CREATE INDEX IF NOT EXISTS idx_history_message ON categorization_history(message_id);
+
 CREATE TABLE IF NOT EXISTS account_retention (
     account_id  INTEGER PRIMARY KEY,
     global_days INTEGER
@@ -120,6 +131,12 @@ CREATE TABLE IF NOT EXISTS llm_debug (
     llm_response  TEXT NOT NULL DEFAULT ''
 );
 
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key        TEXT PRIMARY KEY,
+    response   TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
+);
+
 CREATE TABLE IF NOT EXISTS schema_version (
     version INTEGER NOT NULL DEFAULT 0
 );
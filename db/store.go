@@ -7,7 +7,11 @@ import (
 	_ "embed"
 	"encoding/hex"
 	"fmt"
+	"log/slog"
+	"net/url"
 	"strings"
+	"sync"
+	"sync/atomic"
 	"time"
 
 	_ "modernc.org/sqlite" // register SQLite driver
@@ -18,28 +22,89 @@ import (
 type Store struct {
 	*Queries
 	db *sql.DB
+	// debugLogs enables persisting DEBUG log entries; they are dropped
+	// before touching the database otherwise.
+	debugLogs bool
+
+	// Log entries are queued here and written in batches by logWriter.
+	logCh   chan AddLogParams
+	logQuit chan struct{}
+	logDone chan struct{}
+	// logDropped counts entries discarded because the queue was full.
+	logDropped atomic.Int64
+	// logRetentionDays is how long log rows are kept; the writer deletes
+	// older ones at most every logTrimInterval. lastLogTrim is only touched
+	// by the writer.
+	logRetentionDays atomic.Int64
+	lastLogTrim      time.Time
+
+	// logSubs are notified whenever new log rows are committed.
+	logSubsMu sync.Mutex
+	logSubs   map[chan struct{}]struct{}
+
+	// recentLogs caches the last GetLogs result until logs are written or
+	// trimmed; logsGen counts those changes so a read that raced one is not
+	// cached.
+	logsMu     sync.Mutex
+	logsGen    uint64
+	recentLogs []Log
+	logsLimit  int64
+
+	// settings caches settings rows read through GetSetting.
+	settingsMu sync.Mutex
+	settings   map[string]string
+}
+
+// connPragmas are applied by the driver each time it opens a connection, so a
+// connection recycled by database/sql comes back with the same settings.
+// Reduce SQLite page cache from default ~2MB to 512KB and disable mmap.
+// In WAL mode synchronous=NORMAL only fsyncs at checkpoints and stays
+// corruption-safe; a power loss can at most drop the last transactions.
+var connPragmas = []string{
+	"busy_timeout(5000)",
+	"journal_mode(wal)",
+	"synchronous(normal)",
+	"temp_store(memory)",
+	"foreign_keys(off)",
+	"cache_size(-512)",
+	"mmap_size(0)",
 }
 
 func Open(path string) (*Store, error) {
-	dsn := fmt.Sprintf("file:%s?_journal_mode=wal&_busy_timeout=5000&_foreign_keys=off", path)
+	params := make(url.Values, 1)
+	for _, p := range connPragmas {
+		params.Add("_pragma", p)
+	}
+	dsn := "file:" + path + "?" + params.Encode()
 	db, err := sql.Open("sqlite", dsn)
 	if err != nil {
 		return nil, err
 	}
-	db.SetMaxOpenConns(1) // SQLite WAL: single writer
-	// Reduce SQLite page cache from default ~2MB to 512KB and disable mmap
-	for _, pragma := range []string{"PRAGMA cache_size = -512", "PRAGMA mmap_size = 0"} {
-		if _, err := db.ExecContext(context.Background(), pragma); err != nil {
-			return nil, fmt.Errorf("sqlite pragma: %w", err)
-		}
-	}
+	// SQLite WAL: single writer. Keep that one connection open between calls
+	// instead of reopening the file (and re-running the pragmas) on demand.
+	db.SetMaxOpenConns(1)
+	db.SetMaxIdleConns(1)
+	db.SetConnMaxLifetime(0)
 	if err := db.PingContext(context.Background()); err != nil {
 		return nil, err
 	}
-	return &Store{Queries: New(db), db: db}, nil
+	s := &Store{
+		Queries:  New(db),
+		db:       db,
+		logCh:    make(chan AddLogParams, logQueueSize),
+		logQuit:  make(chan struct{}),
+		logDone:  make(chan struct{}),
+		logSubs:  make(map[chan struct{}]struct{}),
+		settings: make(map[string]string),
+	}
+	go s.logWriter()
+	return s, nil
 }
 
+// Close flushes queued log entries and closes the database.
 func (s *Store) Close() error {
+	close(s.logQuit)
+	<-s.logDone
 	return s.db.Close()
 }
 
@@ -76,6 +141,11 @@ func (s *Store) Migrate() error {
 		s.migration001,
 		s.migration002,
 		s.migration003,
+		s.migration004,
+		s.migration005,
+		s.migration006,
+		s.migration007,
+		s.migration008,
 	}
 
 	for i, m := range migrations {
@@ -164,6 +234,59 @@ func (s *Store) migration003(ctx context.Context) error {
 	return err
 }
 
+// migration004 adds the optional prefilter regex to prompts.
+func (s *Store) migration004(ctx context.Context) error {
+	_, err := s.db.ExecContext(ctx,
+		`ALTER TABLE prompts ADD COLUMN prefilter TEXT NOT NULL DEFAULT ''`)
+	if err != nil && !isSQLiteAlreadyExists(err) {
+		return err
+	}
+	return nil
+}
+
+// migration005 adds the llm_cache table of classification responses.
+func (s *Store) migration005(ctx context.Context) error {
+	_, err := s.db.ExecContext(ctx, `CREATE TABLE IF NOT EXISTS llm_cache (
+		key        TEXT PRIMARY KEY,
+		response   TEXT NOT NULL DEFAULT '',
+		created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S','now'))
+	)`)
+	return err
+}
+
+// migration006 adds the Gmail history ID used for incremental scans.
+func (s *Store) migration006(ctx context.Context) error {
+	_, err := s.db.ExecContext(ctx,
+		`ALTER TABLE accounts ADD COLUMN last_history_id TEXT NOT NULL DEFAULT ''`)
+	if err != nil && !isSQLiteAlreadyExists(err) {
+		return err
+	}
+	return nil
+}
+
+// migration007 indexes logs by timestamp for range queries and trimming.
+func (s *Store) migration007(ctx context.Context) error {
+	_, err := s.db.ExecContext(ctx, `CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp)`)
+	return err
+}
+
+// migration008 indexes the columns the history page filters on and the
+// timestamps the hourly cleanup trims by.
+func (s *Store) migration008(ctx context.Context) error {
+	for _, stmt := range []string{
+		`CREATE INDEX IF NOT EXISTS idx_processed_emails_processed_at ON processed_emails(processed_at)`,
+		`CREATE INDEX IF NOT EXISTS idx_history_timestamp ON categorization_history(timestamp)`,
+		`CREATE INDEX IF NOT EXISTS idx_history_account ON categorization_history(account_id)`,
+		`CREATE INDEX IF NOT EXISTS idx_history_prompt ON categorization_history(prompt_id)`,
+		`CREATE INDEX IF NOT EXISTS idx_history_message ON categorization_history(message_id)`,
+	} {
+		if _, err := s.db.ExecContext(ctx, stmt); err != nil {
+			return err
+		}
+	}
+	return nil
+}
+
 func isSQLiteAlreadyExists(err error) bool {
 	if err == nil {
 		return false
@@ -192,26 +315,263 @@ func (s *Store) GetOrCreateSecretKey() ([]byte, error) {
 	if _, err := rand.Read(key); err != nil {
 		return nil, err
 	}
-	if err := s.Queries.SetSetting(ctx, SetSettingParams{Key: "secret_key", Value: hex.EncodeToString(key)}); err != nil {
+	if err := s.SetSetting(ctx, SetSettingParams{Key: "secret_key", Value: hex.EncodeToString(key)}); err != nil {
 		return nil, err
 	}
 	return key, nil
 }
 
+// ============================================================
+// Settings cache
+// ============================================================
+
+// GetSetting returns a setting, reading the database only the first time a
+// key is requested. All setting writes go through the Store so the cache
+// stays current.
+func (s *Store) GetSetting(ctx context.Context, key string) (string, error) {
+	s.settingsMu.Lock()
+	val, ok := s.settings[key]
+	s.settingsMu.Unlock()
+	if ok {
+		return val, nil
+	}
+	val, err := s.Queries.GetSetting(ctx, key)
+	if err != nil {
+		return "", err
+	}
+	s.settingsMu.Lock()
+	s.settings[key] = val
+	s.settingsMu.Unlock()
+	return val, nil
+}
+
+func (s *Store) SetSetting(ctx context.Context, arg SetSettingParams) error {
+	if err := s.Queries.SetSetting(ctx, arg); err != nil {
+		return err
+	}
+	s.settingsMu.Lock()
+	s.settings[arg.Key] = arg.Value
+	s.settingsMu.Unlock()
+	return nil
+}
+
 // ============================================================
 // Seed
 // ============================================================
 
 func (s *Store) SeedSetting(key, value string) error {
-	return s.Queries.SeedSetting(context.Background(), SeedSettingParams{Key: key, Value: value})
+	err := s.Queries.SeedSetting(context.Background(), SeedSettingParams{Key: key, Value: value})
+	// The insert is skipped for existing keys; reload whichever value won
+	s.settingsMu.Lock()
+	delete(s.settings, key)
+	s.settingsMu.Unlock()
+	return err
 }
 
 // ============================================================
 // Logs helper
 // ============================================================
 
+// SetDebugLogging controls whether DEBUG entries are written to the logs table.
+// Call it once at startup, before the store is shared.
+func (s *Store) SetDebugLogging(on bool) {
+	s.debugLogs = on
+}
+
+// SetLogRetention sets how many days of logs the background writer keeps.
+// Zero or less disables trimming.
+func (s *Store) SetLogRetention(days int) {
+	s.logRetentionDays.Store(int64(days))
+}
+
+// LogEnabled reports whether entries at level are persisted.
+func (s *Store) LogEnabled(level string) bool {
+	return level != "DEBUG" || s.debugLogs
+}
+
+const (
+	// logQueueSize bounds the log entries waiting for the writer; when the
+	// queue is full Log drops the oldest entry to make room.
+	logQueueSize = 1024
+	// logFlushInterval and logFlushBatch control how often queued entries
+	// are written and how many go into one transaction.
+	logFlushInterval = 250 * time.Millisecond
+	logFlushBatch    = 500
+	// logTrimInterval is the minimum time between retention trims.
+	logTrimInterval = time.Hour
+)
+
+// Log queues an entry for the background writer so callers never wait on a
+// database write. If the writer has fallen behind and the queue is full, the
+// oldest queued entry is dropped and counted instead.
 func (s *Store) Log(level, message string) {
-	_ = s.AddLog(context.Background(), AddLogParams{Level: level, Message: message})
+	if !s.LogEnabled(level) {
+		return
+	}
+	entry := AddLogParams{Timestamp: Now(), Level: level, Message: message}
+	for {
+		select {
+		case s.logCh <- entry:
+			return
+		default:
+		}
+		select {
+		case <-s.logCh:
+			s.logDropped.Add(1)
+		default:
+		}
+	}
+}
+
+// SubscribeLogs returns a channel that receives a value after new log rows
+// are committed, and a func to unsubscribe. Notifications coalesce, so a
+// subscriber should read everything new on each wake-up.
+func (s *Store) SubscribeLogs() (<-chan struct{}, func()) {
+	ch := make(chan struct{}, 1)
+	s.logSubsMu.Lock()
+	s.logSubs[ch] = struct{}{}
+	s.logSubsMu.Unlock()
+	return ch, func() {
+		s.logSubsMu.Lock()
+		delete(s.logSubs, ch)
+		s.logSubsMu.Unlock()
+	}
+}
+
+func (s *Store) notifyLogs() {
+	s.invalidateLogs()
+	s.logSubsMu.Lock()
+	defer s.logSubsMu.Unlock()
+	for ch := range s.logSubs {
+		select {
+		case ch <- struct{}{}:
+		default:
+		}
+	}
+}
+
+// GetLogs returns the newest limit log entries. The dashboard and logs page
+// ask for the same page repeatedly, so the last result is reused until the
+// writer or a scan commits new entries (which is also when trims happen).
+// The result must be treated as read-only.
+func (s *Store) GetLogs(ctx context.Context, limit int64) ([]Log, error) {
+	s.logsMu.Lock()
+	gen := s.logsGen
+	if s.recentLogs != nil && s.logsLimit == limit {
+		logs := s.recentLogs
+		s.logsMu.Unlock()
+		return logs, nil
+	}
+	s.logsMu.Unlock()
+
+	logs, err := s.Queries.GetLogs(ctx, limit)
+	if err != nil {
+		return nil, err
+	}
+	if logs == nil {
+		logs = []Log{}
+	}
+	s.logsMu.Lock()
+	if s.logsGen == gen {
+		s.recentLogs, s.logsLimit = logs, limit
+	}
+	s.logsMu.Unlock()
+	return logs, nil
+}
+
+func (s *Store) invalidateLogs() {
+	s.logsMu.Lock()
+	s.logsGen++
+	s.recentLogs = nil
+	s.logsMu.Unlock()
+}
+
+// logWriter writes queued log entries every logFlushInterval, or sooner
+// once logFlushBatch have accumulated, until Close.
+func (s *Store) logWriter() {
+	defer close(s.logDone)
+	ticker := time.NewTicker(logFlushInterval)
+	defer ticker.Stop()
+
+	batch := make([]AddLogParams, 0, logFlushBatch)
+	for {
+		select {
+		case entry := <-s.logCh:
+			batch = append(batch, entry)
+			if len(batch) >= logFlushBatch {
+				s.flushLogs(batch)
+				batch = batch[:0]
+			}
+		case <-ticker.C:
+			if len(batch) > 0 || s.logTrimDue(time.Now()) {
+				s.flushLogs(batch)
+				batch = batch[:0]
+			}
+		case <-s.logQuit:
+		drain:
+			for {
+				select {
+				case entry := <-s.logCh:
+					batch = append(batch, entry)
+				default:
+					break drain
+				}
+			}
+			if len(batch) > 0 {
+				s.flushLogs(batch)
+			}
+			return
+		}
+	}
+}
+
+// flushLogs inserts entries in a single transaction, preceded by a warning
+// if any entries were dropped since the last flush. When a retention trim is
+// due it runs in the same transaction, so it costs no extra commit.
+func (s *Store) flushLogs(entries []AddLogParams) {
+	if n := s.logDropped.Swap(0); n > 0 {
+		entries = append([]AddLogParams{{
+			Timestamp: Now(),
+			Level:     "WARNING",
+			Message:   fmt.Sprintf("Log queue full: dropped %d entries", n),
+		}}, entries...)
+	}
+	ctx := context.Background()
+	tx, err := s.db.BeginTx(ctx, nil)
+	if err != nil {
+		slog.Error("write logs", "err", err)
+		return
+	}
+	defer func() { _ = tx.Rollback() }()
+	q := New(newStmtCache(tx))
+	for _, entry := range entries {
+		if err := q.AddLog(ctx, entry); err != nil {
+			slog.Error("write logs", "err", err)
+			return
+		}
+	}
+	now := time.Now()
+	trim := s.logTrimDue(now)
+	if trim {
+		days := int(s.logRetentionDays.Load())
+		cutoff := now.UTC().AddDate(0, 0, -days).Format("2006-01-02 15:04:05")
+		if err := q.TrimLogs(ctx, cutoff); err != nil {
+			slog.Error("trim logs", "err", err)
+			return
+		}
+	}
+	if err := tx.Commit(); err != nil {
+		slog.Error("write logs", "err", err)
+		return
+	}
+	if trim {
+		s.lastLogTrim = now
+	}
+	s.notifyLogs()
+}
+
+func (s *Store) logTrimDue(now time.Time) bool {
+	return s.logRetentionDays.Load() > 0 && now.Sub(s.lastLogTrim) >= logTrimInterval
 }
 
 // ============================================================
@@ -251,7 +611,7 @@ func (s *Store) ReorderPrompts(ctx context.Context, ids []int64) error {
 		return err
 	}
 	defer func() { _ = tx.Rollback() }()
-	q := s.WithTx(tx)
+	q := New(newStmtCache(tx))
 	for i, id := range ids {
 		if err := q.UpdatePromptSortOrder(ctx, UpdatePromptSortOrderParams{SortOrder: int64(i), ID: id}); err != nil {
 			return err
@@ -264,12 +624,38 @@ func (s *Store) ReorderPrompts(ctx context.Context, ids []int64) error {
 // FilterUnprocessed — returns subset of messageIDs not yet processed
 // ============================================================
 
+// filterUnprocessedChunk bounds the IN list per query. A long lookback with
+// unbounded pagination can return thousands of IDs; smaller statements stay
+// well under SQLite's variable limit and are cheaper to prepare.
+const filterUnprocessedChunk = 500
+
 func (s *Store) FilterUnprocessed(ctx context.Context, accountID int64, messageIDs []string) ([]string, error) {
 	if len(messageIDs) == 0 {
 		return nil, nil
 	}
 
-	// Build query with IN clause
+	processed := make(map[string]bool)
+	for start := 0; start < len(messageIDs); start += filterUnprocessedChunk {
+		end := min(start+filterUnprocessedChunk, len(messageIDs))
+		if err := s.collectProcessed(ctx, accountID, messageIDs[start:end], processed); err != nil {
+			return nil, err
+		}
+	}
+
+	var unprocessed []string
+	for _, id := range messageIDs {
+		if !processed[id] {
+			unprocessed = append(unprocessed, id)
+			// Mark as seen so duplicate IDs across result pages are only returned once
+			processed[id] = true
+		}
+	}
+	return unprocessed, nil
+}
+
+// collectProcessed adds the IDs in messageIDs that are already in
+// processed_emails to the processed set with a single IN query.
+func (s *Store) collectProcessed(ctx context.Context, accountID int64, messageIDs []string, processed map[string]bool) error {
 	var qb strings.Builder
 	qb.WriteString(`SELECT message_id FROM processed_emails WHERE account_id = ? AND message_id IN (`)
 	args := make([]any, 0, len(messageIDs)+1)
@@ -282,33 +668,59 @@ func (s *Store) FilterUnprocessed(ctx context.Context, accountID int64, messageI
 		args = append(args, id)
 	}
 	qb.WriteByte(')')
-	query := qb.String()
 
-	rows, err := s.db.QueryContext(ctx, query, args...)
+	rows, err := s.db.QueryContext(ctx, qb.String(), args...)
 	if err != nil {
-		return nil, err
+		return err
 	}
 	defer func() { _ = rows.Close() }()
 
-	processed := make(map[string]bool)
 	for rows.Next() {
 		var id string
 		if err := rows.Scan(&id); err != nil {
-			return nil, err
+			return err
 		}
 		processed[id] = true
 	}
-	if err := rows.Err(); err != nil {
-		return nil, err
+	return rows.Err()
+}
+
+// ============================================================
+// LLM cache lookups
+// ============================================================
+
+// GetLlmCacheEntries returns the cached responses for keys, keyed by cache
+// key. Keys without an entry are absent from the map.
+func (s *Store) GetLlmCacheEntries(ctx context.Context, keys []string) (map[string]string, error) {
+	entries := make(map[string]string)
+	for start := 0; start < len(keys); start += filterUnprocessedChunk {
+		chunk := keys[start:min(start+filterUnprocessedChunk, len(keys))]
+		query := `SELECT key, response FROM llm_cache WHERE key IN (?` + strings.Repeat(",?", len(chunk)-1) + `)`
+		args := make([]any, len(chunk))
+		for i, k := range chunk {
+			args[i] = k
+		}
+		if err := s.collectLlmCache(ctx, query, args, entries); err != nil {
+			return nil, err
+		}
 	}
+	return entries, nil
+}
 
-	var unprocessed []string
-	for _, id := range messageIDs {
-		if !processed[id] {
-			unprocessed = append(unprocessed, id)
+func (s *Store) collectLlmCache(ctx context.Context, query string, args []any, entries map[string]string) error {
+	rows, err := s.db.QueryContext(ctx, query, args...)
+	if err != nil {
+		return err
+	}
+	defer func() { _ = rows.Close() }()
+	for rows.Next() {
+		var key, response string
+		if err := rows.Scan(&key, &response); err != nil {
+			return err
 		}
+		entries[key] = response
 	}
-	return unprocessed, nil
+	return rows.Err()
 }
 
 // ============================================================
@@ -393,9 +805,12 @@ func (s *Store) GetHistoryLlmResponse(ctx context.Context, id int64) (string, er
 // Batch insert helpers for email processing
 // ============================================================
 
+// LogEntry is a log line produced during a scan, stamped with Now() when it
+// is created.
 type LogEntry struct {
-	Level   string
-	Message string
+	Timestamp string
+	Level     string
+	Message   string
 }
 
 type HistoryEntry struct {
@@ -411,28 +826,121 @@ type HistoryEntry struct {
 	LlmResponse  string
 }
 
-func (s *Store) BatchInsertProcessingResults(ctx context.Context, logs []LogEntry, history []HistoryEntry, accountID int64, messageID string) error {
+// stmtCache is a DBTX that prepares each distinct query once per transaction
+// and reuses the statement, so loops over the generated Queries methods bind
+// new arguments instead of setting the statement up again for every row.
+// Statements prepared on a Tx are closed by Commit/Rollback.
+type stmtCache struct {
+	tx    *sql.Tx
+	stmts map[string]*sql.Stmt
+}
+
+func newStmtCache(tx *sql.Tx) *stmtCache {
+	return &stmtCache{tx: tx, stmts: make(map[string]*sql.Stmt)}
+}
+
+func (c *stmtCache) PrepareContext(ctx context.Context, query string) (*sql.Stmt, error) {
+	if st, ok := c.stmts[query]; ok {
+		return st, nil
+	}
+	st, err := c.tx.PrepareContext(ctx, query)
+	if err != nil {
+		return nil, err
+	}
+	c.stmts[query] = st
+	return st, nil
+}
+
+func (c *stmtCache) ExecContext(ctx context.Context, query string, args ...any) (sql.Result, error) {
+	st, err := c.PrepareContext(ctx, query)
+	if err != nil {
+		return nil, err
+	}
+	return st.ExecContext(ctx, args...)
+}
+
+func (c *stmtCache) QueryContext(ctx context.Context, query string, args ...any) (*sql.Rows, error) {
+	st, err := c.PrepareContext(ctx, query)
+	if err != nil {
+		return nil, err
+	}
+	return st.QueryContext(ctx, args...)
+}
+
+func (c *stmtCache) QueryRowContext(ctx context.Context, query string, args ...any) *sql.Row {
+	st, err := c.PrepareContext(ctx, query)
+	if err != nil {
+		return c.tx.QueryRowContext(ctx, query, args...)
+	}
+	return st.QueryRowContext(ctx, args...)
+}
+
+// ProcessingResult is everything one processed email writes to the database.
+// An empty MessageID leaves the message unprocessed so the next scan retries it.
+type ProcessingResult struct {
+	Logs      []LogEntry
+	History   []HistoryEntry
+	MessageID string
+	LlmDebug  *AddLlmDebugParams
+	LlmCache  []PutLlmCacheParams
+}
+
+// SaveScanResults writes the results of one account scan and bumps the
+// account's last_scan_at in a single transaction, so a scan costs one WAL
+// commit instead of one per statement.
+func (s *Store) SaveScanResults(ctx context.Context, accountID int64, results []ProcessingResult) error {
 	tx, err := s.db.BeginTx(ctx, nil)
 	if err != nil {
 		return err
 	}
 	defer func() { _ = tx.Rollback() }()
-	q := s.WithTx(tx)
+	q := New(newStmtCache(tx))
 
-	for _, l := range logs {
-		if err := q.AddLog(ctx, AddLogParams(l)); err != nil {
-			return err
+	debugWritten := false
+	for _, r := range results {
+		for _, l := range r.Logs {
+			if !s.LogEnabled(l.Level) {
+				continue
+			}
+			if err := q.AddLog(ctx, AddLogParams(l)); err != nil {
+				return err
+			}
+		}
+		for _, h := range r.History {
+			if err := q.AddHistory(ctx, AddHistoryParams(h)); err != nil {
+				return err
+			}
+		}
+		if r.MessageID != "" {
+			if err := q.MarkProcessed(ctx, MarkProcessedParams{AccountID: accountID, MessageID: r.MessageID}); err != nil {
+				return err
+			}
+		}
+		if r.LlmDebug != nil {
+			if err := q.AddLlmDebug(ctx, *r.LlmDebug); err != nil {
+				return err
+			}
+			debugWritten = true
+		}
+		for _, c := range r.LlmCache {
+			if err := q.PutLlmCache(ctx, c); err != nil {
+				return err
+			}
 		}
 	}
-	for _, h := range history {
-		if err := q.AddHistory(ctx, AddHistoryParams(h)); err != nil {
+	if debugWritten {
+		if err := q.TrimLlmDebug(ctx); err != nil {
 			return err
 		}
 	}
-	if err := q.MarkProcessed(ctx, MarkProcessedParams{AccountID: accountID, MessageID: messageID}); err != nil {
+	if err := q.UpdateLastScan(ctx, accountID); err != nil {
 		return err
 	}
-	return tx.Commit()
+	if err := tx.Commit(); err != nil {
+		return err
+	}
+	s.notifyLogs()
+	return nil
 }
 
 // ============================================================
@@ -509,7 +1017,7 @@ func (s *Store) RewriteHistoryForMessage(ctx context.Context, messageID string,
 		}
 	}
 
-	qw := s.WithTx(tx)
+	qw := New(newStmtCache(tx))
 	for _, p := range addedPrompts {
 		if err := qw.AddHistory(ctx, AddHistoryParams{
 			AccountID:    base.AccountID,
@@ -542,32 +1050,39 @@ func (s *Store) RewriteHistoryForMessage(ctx context.Context, messageID string,
 	return tx.Commit()
 }
 
-// ============================================================
-// LLM Debug helpers
-// ============================================================
-
-func (s *Store) RecordLlmDebug(ctx context.Context, e AddLlmDebugParams) error {
-	if err := s.AddLlmDebug(ctx, e); err != nil {
-		return err
-	}
-	return s.TrimLlmDebug(ctx)
-}
-
 // ============================================================
 // Trim helpers
 // ============================================================
 
-func (s *Store) TrimLogs(ctx context.Context, retentionDays int) error {
-	cutoff := time.Now().UTC().AddDate(0, 0, -retentionDays).Format("2006-01-02 15:04:05")
-	return s.Queries.TrimLogs(ctx, cutoff)
-}
-
 func (s *Store) TrimProcessedEmails(ctx context.Context, lookbackHours int) error {
 	cutoff := time.Now().UTC().Add(-time.Duration(lookbackHours*2) * time.Hour).Format("2006-01-02 15:04:05")
 	return s.Queries.TrimProcessedEmails(ctx, sql.NullString{String: cutoff, Valid: true})
 }
 
+// llmCacheRetention bounds how long a cached classification is reused.
+const llmCacheRetention = 7 * 24 * time.Hour
+
+func (s *Store) TrimLlmCache(ctx context.Context) error {
+	cutoff := time.Now().UTC().Add(-llmCacheRetention).Format("2006-01-02 15:04:05")
+	return s.Queries.TrimLlmCache(ctx, cutoff)
+}
+
 func (s *Store) TrimHistory(ctx context.Context, retentionDays int) error {
 	cutoff := time.Now().UTC().AddDate(0, 0, -retentionDays).Format("2006-01-02 15:04:05")
 	return s.Queries.TrimHistory(ctx, cutoff)
 }
+
+// Checkpoint copies committed WAL pages back into the database file without
+// waiting on readers or writers, so the automatic checkpoint rarely has
+// much left to do when a request's commit crosses its threshold.
+func (s *Store) Checkpoint(ctx context.Context) error {
+	_, err := s.db.ExecContext(ctx, "PRAGMA wal_checkpoint(PASSIVE)")
+	return err
+}
+
+// Optimize lets SQLite refresh query planner statistics for tables whose
+// contents changed enough to matter. Cheap when there is nothing to do.
+func (s *Store) Optimize(ctx context.Context) error {
+	_, err := s.db.ExecContext(ctx, "PRAGMA optimize")
+	return err
+}
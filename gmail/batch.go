@@ -0,0 +1,155 @@
+package gmail
+
+import (
+	"bufio"
+	"bytes"
+	"context"
+	"encoding/json"
+	"fmt"
+	"io"
+	"mime"
+	mpart "mime/multipart"
+	"net/http"
+	"net/textproto"
+	"net/url"
+	"strconv"
+	"strings"
+)
+
+const (
+	gmailBatchURL = "https://gmail.googleapis.com/batch/gmail/v1"
+	gmailAPIPath  = "/gmail/v1/users/me"
+
+	// batchSize is the number of messages.get calls sent per batch request.
+	// Gmail accepts up to 100 but recommends 50 to stay clear of per-user
+	// rate limits.
+	batchSize = 50
+
+	batchItemPrefix     = "item"
+	batchResponsePrefix = "response-item"
+)
+
+// batchResult is the outcome of one sub-request of a batch call.
+type batchResult struct {
+	msg *apiMessage
+	err error
+}
+
+// batchGetMessages fetches messages with a single multipart/mixed batch call.
+// The returned slice is index-aligned with ids; sub-requests that failed (or
+// were missing from the response) carry an error so the caller can retry them
+// individually.
+func (c *Client) batchGetMessages(ctx context.Context, ids []string, params url.Values) ([]batchResult, error) {
+	body, contentType, err := buildBatchBody(ids, params)
+	if err != nil {
+		return nil, err
+	}
+	req, err := http.NewRequestWithContext(ctx, http.MethodPost, gmailBatchURL, bytes.NewReader(body))
+	if err != nil {
+		return nil, err
+	}
+	req.Header.Set("Content-Type", contentType)
+	resp, err := c.http.Do(req)
+	if err != nil {
+		return nil, err
+	}
+	defer func() { _ = resp.Body.Close() }()
+	if resp.StatusCode >= 400 {
+		b, _ := io.ReadAll(resp.Body)
+		return nil, fmt.Errorf("gmail batch API: %s", b)
+	}
+	return parseBatchResponse(resp.Header.Get("Content-Type"), resp.Body, len(ids))
+}
+
+// buildBatchBody encodes one GET /messages/{id} sub-request per id and returns
+// the body with its multipart Content-Type.
+func buildBatchBody(ids []string, params url.Values) ([]byte, string, error) {
+	var buf bytes.Buffer
+	w := mpart.NewWriter(&buf)
+	query := params.Encode()
+	for i, id := range ids {
+		h := textproto.MIMEHeader{}
+		h.Set("Content-Type", "application/http")
+		h.Set("Content-ID", "<"+batchItemPrefix+strconv.Itoa(i)+">")
+		pw, err := w.CreatePart(h)
+		if err != nil {
+			return nil, "", err
+		}
+		path := gmailAPIPath + "/messages/" + url.PathEscape(id)
+		if query != "" {
+			path += "?" + query
+		}
+		if _, err := fmt.Fprintf(pw, "GET %s\r\n\r\n", path); err != nil {
+			return nil, "", err
+		}
+	}
+	if err := w.Close(); err != nil {
+		return nil, "", err
+	}
+	return buf.Bytes(), "multipart/mixed; boundary=" + w.Boundary(), nil
+}
+
+// parseBatchResponse splits a multipart/mixed batch response into n results.
+// Parts are matched to requests by their Content-ID ("<response-itemN>"),
+// falling back to part order when the header is absent.
+func parseBatchResponse(contentType string, body io.Reader, n int) ([]batchResult, error) {
+	mediaType, params, err := mime.ParseMediaType(contentType)
+	if err != nil {
+		return nil, fmt.Errorf("batch response content type: %w", err)
+	}
+	if !strings.HasPrefix(mediaType, "multipart/") || params["boundary"] == "" {
+		return nil, fmt.Errorf("unexpected batch response content type %q", contentType)
+	}
+
+	results := make([]batchResult, n)
+	seen := make([]bool, n)
+	mr := mpart.NewReader(body, params["boundary"])
+	for ordinal := 0; ; ordinal++ {
+		p, err := mr.NextPart()
+		if err == io.EOF {
+			break
+		}
+		if err != nil {
+			return nil, err
+		}
+		idx := batchPartIndex(p.Header.Get("Content-ID"), ordinal)
+		if idx < 0 || idx >= n {
+			continue
+		}
+		seen[idx] = true
+		results[idx] = parseBatchPart(p)
+	}
+	for i := range results {
+		if !seen[i] {
+			results[i].err = fmt.Errorf("gmail batch: no response for item %d", i)
+		}
+	}
+	return results, nil
+}
+
+func batchPartIndex(contentID string, ordinal int) int {
+	id := strings.Trim(contentID, "<>")
+	if rest, ok := strings.CutPrefix(id, batchResponsePrefix); ok {
+		if i, err := strconv.Atoi(rest); err == nil {
+			return i
+		}
+	}
+	return ordinal
+}
+
+func parseBatchPart(p io.Reader) batchResult {
+	resp, err := http.ReadResponse(bufio.NewReader(p), nil)
+	if err != nil {
+		return batchResult{err: fmt.Errorf("gmail batch: read part: %w", err)}
+	}
+	defer func() { _ = resp.Body.Close() }()
+	if resp.StatusCode >= 400 {
+		b, _ := io.ReadAll(resp.Body)
+		return batchResult{err: fmt.Errorf("gmail API %d: %s", resp.StatusCode, b)}
+	}
+	var m apiMessage
+	if err := json.NewDecoder(resp.Body).Decode(&m); err != nil {
+		return batchResult{err: err}
+	}
+	return batchResult{msg: &m}
+}
@@ -0,0 +1,127 @@
+package gmail
+
+import (
+	"bytes"
+	"fmt"
+	"mime"
+	mpart "mime/multipart"
+	"net/textproto"
+	"net/url"
+	"strings"
+	"testing"
+)
+
+func TestBuildBatchBody(t *testing.T) {
+	body, contentType, err := buildBatchBody([]string{"a1", "b2"}, url.Values{"format": {"full"}})
+	if err != nil {
+		t.Fatal(err)
+	}
+	_, params, err := mime.ParseMediaType(contentType)
+	if err != nil {
+		t.Fatal(err)
+	}
+
+	mr := mpart.NewReader(bytes.NewReader(body), params["boundary"])
+	wantLines := []string{
+		"GET /gmail/v1/users/me/messages/a1?format=full",
+		"GET /gmail/v1/users/me/messages/b2?format=full",
+	}
+	for i, want := range wantLines {
+		p, err := mr.NextPart()
+		if err != nil {
+			t.Fatalf("part %d: %v", i, err)
+		}
+		if got := p.Header.Get("Content-ID"); got != fmt.Sprintf("<item%d>", i) {
+			t.Errorf("part %d Content-ID = %q", i, got)
+		}
+		var buf bytes.Buffer
+		_, _ = buf.ReadFrom(p)
+		if got := strings.TrimSpace(buf.String()); got != want {
+			t.Errorf("part %d request line = %q, want %q", i, got, want)
+		}
+	}
+}
+
+// batchResponse builds a multipart/mixed batch response from raw HTTP
+// responses keyed by Content-ID.
+func batchResponse(t *testing.T, parts [][2]string) (string, *bytes.Buffer) {
+	t.Helper()
+	var buf bytes.Buffer
+	w := mpart.NewWriter(&buf)
+	for _, p := range parts {
+		h := textproto.MIMEHeader{}
+		h.Set("Content-Type", "application/http")
+		if p[0] != "" {
+			h.Set("Content-ID", p[0])
+		}
+		pw, err := w.CreatePart(h)
+		if err != nil {
+			t.Fatal(err)
+		}
+		_, _ = pw.Write([]byte(p[1]))
+	}
+	_ = w.Close()
+	return "multipart/mixed; boundary=" + w.Boundary(), &buf
+}
+
+func httpResponse(status int, body string) string {
+	return fmt.Sprintf("HTTP/1.1 %d X\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s", status, len(body), body)
+}
+
+func TestParseBatchResponse(t *testing.T) {
+	ok := func(id string) string { return httpResponse(200, `{"id":"`+id+`","snippet":"hi `+id+`"}`) }
+
+	tests := []struct {
+		name    string
+		parts   [][2]string
+		n       int
+		wantIDs []string // "" means the item should carry an error
+	}{
+		{
+			name:    "in order",
+			parts:   [][2]string{{"<response-item0>", ok("a")}, {"<response-item1>", ok("b")}},
+			n:       2,
+			wantIDs: []string{"a", "b"},
+		},
+		{
+			name:    "out of order matched by Content-ID",
+			parts:   [][2]string{{"<response-item1>", ok("b")}, {"<response-item0>", ok("a")}},
+			n:       2,
+			wantIDs: []string{"a", "b"},
+		},
+		{
+			name:    "failed sub-request",
+			parts:   [][2]string{{"<response-item0>", httpResponse(404, `{"error":"not found"}`)}, {"<response-item1>", ok("b")}},
+			n:       2,
+			wantIDs: []string{"", "b"},
+		},
+		{
+			name:    "missing response and no Content-ID",
+			parts:   [][2]string{{"", ok("a")}},
+			n:       2,
+			wantIDs: []string{"a", ""},
+		},
+	}
+
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			ct, body := batchResponse(t, tc.parts)
+			results, err := parseBatchResponse(ct, body, tc.n)
+			if err != nil {
+				t.Fatal(err)
+			}
+			for i, want := range tc.wantIDs {
+				r := results[i]
+				if want == "" {
+					if r.err == nil {
+						t.Errorf("item %d: expected error, got %+v", i, r.msg)
+					}
+					continue
+				}
+				if r.err != nil || r.msg == nil || r.msg.ID != want {
+					t.Errorf("item %d: got msg=%+v err=%v, want id %q", i, r.msg, r.err, want)
+				}
+			}
+		})
+	}
+}
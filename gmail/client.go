@@ -5,17 +5,21 @@ import (
 	"context"
 	"encoding/base64"
 	"encoding/json"
+	"errors"
 	"fmt"
 	"io"
 	"log/slog"
+	"maps"
 	"math/rand"
 	"net/http"
 	"net/url"
+	"slices"
 	"sort"
 	"strconv"
 	"strings"
 	"sync"
 	"time"
+	"unicode/utf8"
 
 	"golang.org/x/oauth2"
 )
@@ -146,6 +150,25 @@ type apiListMessagesResponse struct {
 	NextPageToken string          `json:"nextPageToken"`
 }
 
+type apiHistoryMessage struct {
+	Message apiMessageRef `json:"message"`
+}
+
+type apiHistoryLabels struct {
+	Message  apiMessageRef `json:"message"`
+	LabelIDs []string      `json:"labelIds"`
+}
+
+type apiListHistoryResponse struct {
+	History []struct {
+		MessagesAdded   []apiHistoryMessage `json:"messagesAdded"`
+		MessagesDeleted []apiHistoryMessage `json:"messagesDeleted"`
+		LabelsAdded     []apiHistoryLabels  `json:"labelsAdded"`
+	} `json:"history"`
+	NextPageToken string `json:"nextPageToken"`
+	HistoryID     string `json:"historyId"`
+}
+
 type apiMessagePartBody struct {
 	Data         string `json:"data"`
 	AttachmentID string `json:"attachmentId"`
@@ -154,6 +177,7 @@ type apiMessagePartBody struct {
 
 type apiMessagePart struct {
 	MimeType string `json:"mimeType"`
+	Filename string `json:"filename"`
 	Headers  []struct {
 		Name  string `json:"name"`
 		Value string `json:"value"`
@@ -176,6 +200,17 @@ type apiBatchModifyRequest struct {
 
 // --- HTTP helpers ---
 
+// APIError is a non-2xx response from the Gmail API.
+type APIError struct {
+	Path       string
+	StatusCode int
+	Body       string
+}
+
+func (e *APIError) Error() string {
+	return fmt.Sprintf("gmail API %s: %s", e.Path, e.Body)
+}
+
 func (c *Client) get(ctx context.Context, path string, params url.Values, out any) error {
 	u := gmailBase + path
 	if len(params) > 0 {
@@ -192,7 +227,7 @@ func (c *Client) get(ctx context.Context, path string, params url.Values, out an
 	defer func() { _ = resp.Body.Close() }()
 	if resp.StatusCode >= 400 {
 		body, _ := io.ReadAll(resp.Body)
-		return fmt.Errorf("gmail API %s: %s", path, body)
+		return &APIError{Path: path, StatusCode: resp.StatusCode, Body: string(body)}
 	}
 	return json.NewDecoder(resp.Body).Decode(out)
 }
@@ -214,7 +249,7 @@ func (c *Client) post(ctx context.Context, path string, in any, out any) error {
 	defer func() { _ = resp.Body.Close() }()
 	if resp.StatusCode >= 400 {
 		b, _ := io.ReadAll(resp.Body)
-		return fmt.Errorf("gmail API %s: %s", path, b)
+		return &APIError{Path: path, StatusCode: resp.StatusCode, Body: string(b)}
 	}
 	if out != nil {
 		return json.NewDecoder(resp.Body).Decode(out)
@@ -287,6 +322,87 @@ func ListRecentMessageIDs(ctx context.Context, svc *Client, lookbackHours int, m
 	return paginateMessageIDs(ctx, svc, q, maxResults, 0)
 }
 
+// ErrHistoryExpired is returned by ListHistoryMessageIDs when Gmail no longer
+// keeps history back to the start ID; callers fall back to a full listing.
+var ErrHistoryExpired = errors.New("gmail history ID expired")
+
+// historyParams are the fixed query parameters for history.list.
+var historyParams = url.Values{
+	"historyTypes": {"messageAdded", "messageDeleted", "labelAdded"},
+	"labelId":      {LabelInbox},
+	"maxResults":   {"500"},
+	"fields":       {"history(messagesAdded/message/id,messagesDeleted/message/id,labelsAdded(message/id,labelIds)),nextPageToken,historyId"},
+}
+
+// GetHistoryID returns the mailbox's current history ID.
+func GetHistoryID(ctx context.Context, svc *Client) (string, error) {
+	var profile struct {
+		HistoryID string `json:"historyId"`
+	}
+	if err := svc.get(ctx, "/profile", url.Values{"fields": {"historyId"}}, &profile); err != nil {
+		return "", err
+	}
+	return profile.HistoryID, nil
+}
+
+// ListHistoryMessageIDs returns the IDs of messages added to the inbox since
+// startHistoryID, either as new mail or by having the INBOX label put back,
+// that have not been deleted since, in arrival order, and the history ID to
+// resume from next time. At most maxResults IDs are returned, keeping the
+// most recent, so a long gap between scans does not become one huge scan.
+func ListHistoryMessageIDs(ctx context.Context, svc *Client, startHistoryID string, maxResults int64) ([]string, string, error) {
+	var ids []string
+	added := make(map[string]bool)
+	params := maps.Clone(historyParams)
+	params.Set("startHistoryId", startHistoryID)
+	var historyID string
+	for {
+		var res apiListHistoryResponse
+		if err := svc.get(ctx, "/history", params, &res); err != nil {
+			var apiErr *APIError
+			if errors.As(err, &apiErr) && apiErr.StatusCode == http.StatusNotFound {
+				return nil, "", ErrHistoryExpired
+			}
+			return nil, "", err
+		}
+		for _, h := range res.History {
+			for _, m := range h.MessagesAdded {
+				if _, ok := added[m.Message.ID]; !ok {
+					ids = append(ids, m.Message.ID)
+				}
+				added[m.Message.ID] = true
+			}
+			for _, l := range h.LabelsAdded {
+				if !slices.Contains(l.LabelIDs, LabelInbox) {
+					continue
+				}
+				if _, ok := added[l.Message.ID]; !ok {
+					ids = append(ids, l.Message.ID)
+				}
+				added[l.Message.ID] = true
+			}
+			for _, m := range h.MessagesDeleted {
+				if _, ok := added[m.Message.ID]; ok {
+					added[m.Message.ID] = false
+				}
+			}
+		}
+		historyID = res.HistoryID
+		if res.NextPageToken == "" {
+			break
+		}
+		params.Set("pageToken", res.NextPageToken)
+	}
+	ids = slices.DeleteFunc(ids, func(id string) bool { return !added[id] })
+	if maxResults > 0 && int64(len(ids)) > maxResults {
+		ids = ids[int64(len(ids))-maxResults:]
+	}
+	if historyID == "" {
+		historyID = startHistoryID
+	}
+	return ids, historyID, nil
+}
+
 func paginateMessageIDs(ctx context.Context, svc *Client, q string, maxResults int64, maxPages int) ([]string, error) {
 	var ids []string
 	var pageToken string
@@ -324,7 +440,30 @@ type Message struct {
 	Snippet string `json:"snippet"`
 }
 
-// IterMessageDetails fetches full message details concurrently (up to 10 at a time).
+// messagePartFields lists the MIME part fields body extraction reads.
+const messagePartFields = "mimeType,filename,body(data,attachmentId)"
+
+// messageFields limits messages.get to what fetchMessage uses: id, snippet,
+// the top-level headers and the part tree without per-part headers.
+// The fields syntax has no recursion, so parts are spelled out three levels
+// deep and the deepest level is left unrestricted for unusually nested mail.
+var messageFields = "id,snippet,payload(headers(name,value)," + messagePartFields + "," +
+	nestedPartFields(3) + ")"
+
+func nestedPartFields(depth int) string {
+	if depth == 0 {
+		return "parts"
+	}
+	return "parts(" + messagePartFields + "," + nestedPartFields(depth-1) + ")"
+}
+
+// messageGetParams are the query parameters for messages.get.
+var messageGetParams = url.Values{"format": {"full"}, "fields": {messageFields}}
+
+// IterMessageDetails fetches full message details in batch requests of up to
+// batchSize messages. Body extraction (which may fetch attachments) runs
+// concurrently, up to 10 at a time. Messages whose batch sub-request failed
+// are retried with a single messages.get.
 func IterMessageDetails(ctx context.Context, svc *Client, ids []string, maxBodyChars int) (<-chan Message, <-chan error) {
 	msgCh := make(chan Message, 5)
 	errCh := make(chan error, 1)
@@ -338,27 +477,43 @@ func IterMessageDetails(ctx context.Context, svc *Client, ids []string, maxBodyC
 		var mu sync.Mutex
 		var firstErr error
 
-		for _, id := range ids {
-			wg.Add(1)
-			sem <- struct{}{}
-			go func() {
-				defer wg.Done()
-				defer func() { <-sem }()
-
-				msg, err := fetchMessage(ctx, svc, id, maxBodyChars)
-				mu.Lock()
-				defer mu.Unlock()
-				if err != nil {
-					if firstErr == nil {
-						firstErr = err
+		for start := 0; start < len(ids); start += batchSize {
+			chunk := ids[start:min(start+batchSize, len(ids))]
+			results, err := svc.batchGetMessages(ctx, chunk, messageGetParams)
+			if err != nil {
+				slog.Debug("gmail batch get failed, fetching individually", "count", len(chunk), "err", err)
+				results = make([]batchResult, len(chunk))
+			}
+
+			for i, id := range chunk {
+				fetched := results[i].msg
+				wg.Add(1)
+				sem <- struct{}{}
+				go func() {
+					defer wg.Done()
+					defer func() { <-sem }()
+
+					var msg Message
+					var err error
+					if fetched != nil {
+						msg = buildMessage(ctx, svc, id, fetched, maxBodyChars)
+					} else {
+						msg, err = fetchMessage(ctx, svc, id, maxBodyChars)
 					}
-					return
-				}
-				select {
-				case msgCh <- msg:
-				case <-ctx.Done():
-				}
-			}()
+					mu.Lock()
+					defer mu.Unlock()
+					if err != nil {
+						if firstErr == nil {
+							firstErr = err
+						}
+						return
+					}
+					select {
+					case msgCh <- msg:
+					case <-ctx.Done():
+					}
+				}()
+			}
 		}
 		wg.Wait()
 		if firstErr != nil {
@@ -379,9 +534,14 @@ func FetchMessage(ctx context.Context, svc *Client, id string, maxBodyChars int)
 
 func fetchMessage(ctx context.Context, svc *Client, id string, maxBodyChars int) (Message, error) {
 	var m apiMessage
-	if err := svc.get(ctx, "/messages/"+id, url.Values{"format": {"full"}}, &m); err != nil {
+	if err := svc.get(ctx, "/messages/"+id, messageGetParams, &m); err != nil {
 		return Message{}, err
 	}
+	return buildMessage(ctx, svc, id, &m, maxBodyChars), nil
+}
+
+// buildMessage converts an API message into a Message, extracting the body.
+func buildMessage(ctx context.Context, svc *Client, id string, m *apiMessage, maxBodyChars int) Message {
 	msg := Message{
 		ID:      id,
 		Snippet: m.Snippet,
@@ -397,14 +557,49 @@ func fetchMessage(ctx context.Context, svc *Client, id string, maxBodyChars int)
 		}
 		msg.Body = extractPayloadBody(ctx, svc, id, m.Payload, maxBodyChars)
 	}
-	return msg, nil
+	return msg
 }
 
 func extractPayloadBody(ctx context.Context, svc *Client, msgID string, payload *apiMessagePart, maxChars int) string {
 	if payload == nil {
 		return ""
 	}
-	return Truncate(extractBodyRecursive(ctx, svc, msgID, payload, maxChars*3), maxChars)
+	return Truncate(normalizeBody(extractBodyRecursive(ctx, svc, msgID, payload, maxChars*3)), maxChars)
+}
+
+// decodeBase64Prefix decodes at most maxBytes bytes (0 = all) from the start
+// of Gmail's base64 body data without decoding the rest. A multibyte rune cut
+// by the limit is dropped.
+func decodeBase64Prefix(data string, maxBytes int) ([]byte, error) {
+	truncated := false
+	if maxBytes > 0 {
+		// Every 4 base64 characters decode to 3 bytes; cutting on a multiple
+		// of 4 keeps the prefix independently decodable.
+		if n := (maxBytes + 2) / 3 * 4; n < len(data) {
+			data = data[:n]
+			truncated = true
+		}
+	}
+	out, err := base64.URLEncoding.DecodeString(data)
+	if err != nil {
+		out, err = base64.StdEncoding.DecodeString(data)
+		if err != nil {
+			return nil, err
+		}
+	}
+	if maxBytes > 0 && len(out) > maxBytes {
+		out = out[:maxBytes]
+		truncated = true
+	}
+	if truncated {
+		for i := 0; i < utf8.UTFMax-1 && len(out) > 0; i++ {
+			if r, size := utf8.DecodeLastRune(out); r != utf8.RuneError || size != 1 {
+				break
+			}
+			out = out[:len(out)-1]
+		}
+	}
+	return out, nil
 }
 
 func extractBodyRecursive(ctx context.Context, svc *Client, msgID string, part *apiMessagePart, maxChars int) string {
@@ -414,8 +609,10 @@ func extractBodyRecursive(ctx context.Context, svc *Client, msgID string, part *
 	mimeType := strings.ToLower(part.MimeType)
 
 	if len(part.Parts) == 0 {
-		// Only process text/* parts — skip image/*, application/*, etc.
-		if !strings.HasPrefix(mimeType, "text/") {
+		// Only process text/plain and text/html bodies. Attachments (parts with
+		// a filename, e.g. .txt or .csv files) and other text/* types such as
+		// calendar invites are skipped before any data is fetched or decoded.
+		if part.Filename != "" || (mimeType != "text/plain" && mimeType != "text/html") {
 			return ""
 		}
 		// Leaf node — get the raw base64 data, fetching via attachment API if not inline
@@ -436,12 +633,17 @@ func extractBodyRecursive(ctx context.Context, svc *Client, msgID string, part *
 		if rawData == "" {
 			return ""
 		}
-		data, err := base64.URLEncoding.DecodeString(rawData)
+		// Plain text is truncated to maxChars anyway, so only decode enough of
+		// it (with slack for invisibles that cleanInvisibles strips). HTML is
+		// decoded in full because markup and <style> blocks can push the
+		// visible text arbitrarily far into the document.
+		decodeLimit := 0
+		if mimeType == "text/plain" {
+			decodeLimit = 2 * maxChars
+		}
+		data, err := decodeBase64Prefix(rawData, decodeLimit)
 		if err != nil {
-			data, err = base64.StdEncoding.DecodeString(rawData)
-			if err != nil {
-				return ""
-			}
+			return ""
 		}
 		text := string(data)
 		if strings.Contains(mimeType, "html") {
@@ -505,13 +707,14 @@ func BatchModifyEmails(ctx context.Context, svc *Client, mods []Modify) error {
 	grouped := make(map[key]*apiBatchModifyRequest)
 
 	for _, m := range mods {
-		add := strings.Join(m.AddLabels, ",")
-		remove := strings.Join(m.RemoveLabels, ",")
-		k := key{add, remove}
+		// Sort and dedupe so merged per-message changes with the same label
+		// sets share one batchModify call regardless of rule order.
+		addLabels, removeLabels := normalizeLabels(m.AddLabels), normalizeLabels(m.RemoveLabels)
+		k := key{strings.Join(addLabels, ","), strings.Join(removeLabels, ",")}
 		if _, ok := grouped[k]; !ok {
 			grouped[k] = &apiBatchModifyRequest{
-				AddLabelIDs:    m.AddLabels,
-				RemoveLabelIDs: m.RemoveLabels,
+				AddLabelIDs:    addLabels,
+				RemoveLabelIDs: removeLabels,
 			}
 		}
 		grouped[k].IDs = append(grouped[k].IDs, m.MessageIDs...)
@@ -536,6 +739,12 @@ func BatchModifyEmails(ctx context.Context, svc *Client, mods []Modify) error {
 	return nil
 }
 
+func normalizeLabels(labels []string) []string {
+	labels = slices.Clone(labels)
+	slices.Sort(labels)
+	return slices.Compact(labels)
+}
+
 // BatchTrashEmails moves messages to trash.
 func BatchTrashEmails(ctx context.Context, svc *Client, ids []string) error {
 	for len(ids) > 0 {
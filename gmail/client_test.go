@@ -70,6 +70,25 @@ func TestExtractBodyRecursive(t *testing.T) {
 			),
 			want: "",
 		},
+		{
+			name: "text attachment skipped",
+			root: apiMessagePart{
+				MimeType: "multipart/mixed",
+				Parts: []apiMessagePart{
+					part("text/plain", "Body text"),
+					{MimeType: "text/plain", Filename: "report.txt", Body: &apiMessagePartBody{Data: b64("attachment contents")}},
+				},
+			},
+			want: "Body text",
+		},
+		{
+			name: "calendar part skipped",
+			root: multipart(
+				part("text/plain", "See invite"),
+				part("text/calendar", "BEGIN:VCALENDAR\nEND:VCALENDAR"),
+			),
+			want: "See invite",
+		},
 		{
 			name: "plain only in multipart",
 			root: multipart(
@@ -88,3 +107,29 @@ func TestExtractBodyRecursive(t *testing.T) {
 		})
 	}
 }
+
+func TestDecodeBase64Prefix(t *testing.T) {
+	tests := []struct {
+		name     string
+		in       string
+		maxBytes int
+		want     string
+	}{
+		{name: "no limit", in: "hello world", maxBytes: 0, want: "hello world"},
+		{name: "limit larger than data", in: "hello", maxBytes: 100, want: "hello"},
+		{name: "ascii prefix", in: "hello world", maxBytes: 5, want: "hello"},
+		{name: "cut rune dropped", in: "ab\u00e9\u00e9", maxBytes: 3, want: "ab"},
+		{name: "whole rune kept", in: "ab\u00e9\u00e9", maxBytes: 4, want: "ab\u00e9"},
+	}
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			got, err := decodeBase64Prefix(b64(tc.in), tc.maxBytes)
+			if err != nil {
+				t.Fatal(err)
+			}
+			if string(got) != tc.want {
+				t.Errorf("got %q, want %q", got, tc.want)
+			}
+		})
+	}
+}
@@ -119,6 +119,28 @@ func cleanInvisibles(s string) string {
 	}, s)
 }
 
+// normalizeBody prepares a message body for classification: quoted reply
+// lines ("> ...") and the "... wrote:" line introducing them are dropped,
+// trailing whitespace is trimmed and runs of blank lines collapse to one.
+func normalizeBody(s string) string {
+	lines := strings.Split(s, "\n")
+	out := lines[:0]
+	for _, l := range lines {
+		l = strings.TrimRight(l, " \t")
+		if strings.HasPrefix(strings.TrimLeft(l, " \t"), ">") {
+			if n := len(out); n > 0 && strings.HasSuffix(out[n-1], "wrote:") {
+				out = out[:n-1]
+			}
+			continue
+		}
+		if l == "" && (len(out) == 0 || out[len(out)-1] == "") {
+			continue
+		}
+		out = append(out, l)
+	}
+	return strings.TrimSpace(strings.Join(out, "\n"))
+}
+
 // Truncate returns s truncated to maxChars bytes.
 func Truncate(s string, maxChars int) string {
 	if len(s) <= maxChars {
@@ -93,3 +93,28 @@ func TestExtractText(t *testing.T) {
 		})
 	}
 }
+
+func TestNormalizeBody(t *testing.T) {
+	tests := []struct {
+		name  string
+		input string
+		want  string
+	}{
+		{"plain text unchanged", "Hello\nworld", "Hello\nworld"},
+		{"blank runs collapsed", "a\n\n\n\nb", "a\n\nb"},
+		{"whitespace-only lines are blank", "a\n  \n\t\nb", "a\n\nb"},
+		{"trailing spaces trimmed", "a  \nb\t", "a\nb"},
+		{"quoted reply dropped", "Thanks!\n\n> earlier\n> message", "Thanks!"},
+		{"attribution line dropped", "Sounds good.\n\nOn Mon, Jan 1, Bob wrote:\n> hi\n>> older", "Sounds good."},
+		{"text after quote kept", "> question\nanswer", "answer"},
+		{"leading blanks trimmed", "\n\n  \nbody", "body"},
+		{"empty string", "", ""},
+	}
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			if got := normalizeBody(tc.input); got != tc.want {
+				t.Errorf("normalizeBody(%q) = %q; want %q", tc.input, got, tc.want)
+			}
+		})
+	}
+}
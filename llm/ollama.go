@@ -4,12 +4,18 @@ import (
 	"bufio"
 	"bytes"
 	"context"
+	"crypto/sha256"
+	"encoding/hex"
 	"encoding/json"
+	"errors"
 	"fmt"
 	"io"
 	"log/slog"
+	"net"
 	"net/http"
 	"regexp"
+	"slices"
+	"strconv"
 	"strings"
 	"time"
 
@@ -17,7 +23,6 @@ import (
 )
 
 var fenceRe = regexp.MustCompile(`(?s)^` + "```" + `(?:json)?\s*|\s*` + "```" + `$`)
-var blankRunRe = regexp.MustCompile(`\n{3,}`)
 
 const (
 	jsonKeyModel       = "model"
@@ -36,22 +41,53 @@ type Client struct {
 	host       string
 	model      string
 	numCtx     int
+	batchSize  int
 	timeout    time.Duration
 	httpClient *http.Client
+	pullClient *http.Client
+	// chatSem bounds concurrent classification requests across account
+	// scans; interactive chats from the UI do not wait on it.
+	chatSem chan struct{}
 }
 
-func NewClient(host, model string, numCtx int, timeout time.Duration) *Client {
+// maxConcurrentChats is how many classification requests are sent to Ollama
+// at once; Ollama serves only a couple of parallel requests per model by
+// default and queues the rest.
+const maxConcurrentChats = 2
+
+// NewClient returns a client for the Ollama API at host. batchSize caps how
+// many emails share one classification request; values below 1 mean 1.
+func NewClient(host, model string, numCtx, batchSize int, timeout time.Duration) *Client {
+	// Every request goes to the same Ollama host, so keep a dedicated pool
+	// with enough idle connections for concurrent classify and UI calls
+	// (DefaultTransport keeps only 2 per host).
+	transport := http.DefaultTransport.(*http.Transport).Clone() //nolint:forcetypeassert // DefaultTransport is always *http.Transport
+	transport.MaxIdleConnsPerHost = 8
+	transport.IdleConnTimeout = 5 * time.Minute
 	return &Client{
 		host:       strings.TrimRight(host, "/"),
 		model:      model,
 		numCtx:     numCtx,
+		batchSize:  max(1, batchSize),
 		timeout:    timeout,
-		httpClient: &http.Client{Timeout: timeout},
+		httpClient: &http.Client{Timeout: timeout, Transport: transport},
+		// Model pulls can take far longer than a classify call; no timeout.
+		pullClient: &http.Client{Transport: transport},
+		chatSem:    make(chan struct{}, maxConcurrentChats),
 	}
 }
 
+// closeBody drains and closes a response body so the connection can be reused.
+func closeBody(resp *http.Response) {
+	_, _ = io.Copy(io.Discard, resp.Body)
+	_ = resp.Body.Close()
+}
+
 func (c *Client) Model() string { return c.model }
 
+// BatchSize is the most emails sent in one classification request.
+func (c *Client) BatchSize() int { return c.batchSize }
+
 // ============================================================
 // Model management
 // ============================================================
@@ -85,7 +121,7 @@ func (c *Client) modelExists(ctx context.Context) (bool, error) {
 	if err != nil {
 		return false, err
 	}
-	defer func() { _ = resp.Body.Close() }()
+	defer closeBody(resp)
 	return resp.StatusCode == http.StatusOK, nil
 }
 
@@ -96,14 +132,12 @@ func (c *Client) pullModel(ctx context.Context) error {
 	}
 	req, _ := http.NewRequestWithContext(ctx, http.MethodPost, c.host+"/api/pull", bytes.NewReader(body))
 	req.Header.Set("Content-Type", "application/json")
-	// Use unlimited timeout client for pull
-	resp, err := (&http.Client{}).Do(req)
+	resp, err := c.pullClient.Do(req)
 	if err != nil {
 		return err
 	}
-	defer func() { _ = resp.Body.Close() }()
 	// Drain streaming response
-	_, _ = io.Copy(io.Discard, resp.Body)
+	closeBody(resp)
 	return nil
 }
 
@@ -129,12 +163,56 @@ type Error struct{ Msg string }
 
 func (e *Error) Error() string { return e.Msg }
 
-func (c *Client) buildClassifyPayload(email Email, prompts []Prompt) map[string]any {
-	body := buildBody(email, prompts)
-	numPredict := 32
-	if n := len(prompts) * 10; n > numPredict {
-		numPredict = n
+// Classifier classifies emails against one fixed list of prompts. The rules
+// text and prompt scaffolding are built once in NewClassifier, so every
+// request it sends starts with the same prefix and Ollama can reuse its
+// prompt cache between calls.
+type Classifier struct {
+	c       *Client
+	prompts []Prompt
+	// prefix is the single-email prompt up to the email itself.
+	prefix string
+	// rulesText and multiExample are the shared parts of the multi-email prompt.
+	rulesText    string
+	multiExample string
+}
+
+// NewClassifier prepares a Classifier for prompts.
+func (c *Client) NewClassifier(prompts []Prompt) *Classifier {
+	rulesText := buildRulesText(prompts)
+	exampleParts := make([]string, min(2, len(prompts)))
+	for i := range exampleParts {
+		exampleParts[i] = fmt.Sprintf(`"%d": false`, i+1)
+	}
+	exampleRules := strings.Join(exampleParts, ", ")
+
+	return &Classifier{
+		c:       c,
+		prompts: prompts,
+		prefix: fmt.Sprintf(`You are an email classification assistant. For each rule below, decide if the label should be applied to the email that follows.
+
+Rules:
+%s
+Respond with ONLY a JSON object where each key is the rule's number (1, 2, 3...) and the value is true or false.
+Example: {%s}
+No explanation, no markdown, just the JSON object.
+
+Email:
+`, rulesText, exampleRules),
+		rulesText:    rulesText,
+		multiExample: fmt.Sprintf(`{"1": {%s}, "2": {%s}}`, exampleRules, exampleRules),
 	}
+}
+
+func (cl *Classifier) payload(email Email) map[string]any {
+	return cl.c.classifyPayload(cl.body(email), max(32, len(cl.prompts)*10))
+}
+
+func (cl *Classifier) multiPayload(emails []Email) map[string]any {
+	return cl.c.classifyPayload(cl.multiBody(emails), max(32, len(emails)*(len(cl.prompts)*10+8)))
+}
+
+func (c *Client) classifyPayload(body string, numPredict int) map[string]any {
 	return map[string]any{
 		jsonKeyModel: c.model,
 		jsonKeyMessages: []map[string]string{
@@ -157,26 +235,34 @@ func (c *Client) BuildClassifyRequestJSON(email Email, prompts []Prompt) string
 	if len(prompts) == 0 {
 		return ""
 	}
-	b, err := json.Marshal(c.buildClassifyPayload(email, prompts))
+	b, err := json.Marshal(c.NewClassifier(prompts).payload(email))
 	if err != nil {
 		return "{}"
 	}
 	return string(b)
 }
 
-// ClassifyResult holds the output of ClassifyEmailBatch.
+// ClassifyResult holds the output of classifying one email.
+// Logs collects the log lines produced while classifying so the caller can
+// persist them together with the rest of the email's results.
 type ClassifyResult struct {
 	Results     map[int64]bool
 	RequestJSON string
 	RawResponse string
+	Logs        []db.LogEntry
 }
 
-func (c *Client) ClassifyEmailBatch(ctx context.Context, store *db.Store, email Email, prompts []Prompt) (ClassifyResult, error) {
-	if len(prompts) == 0 {
+func (r *ClassifyResult) log(level, message string) {
+	r.Logs = append(r.Logs, db.LogEntry{Timestamp: db.Now(), Level: level, Message: message})
+}
+
+// Classify classifies a single email.
+func (cl *Classifier) Classify(ctx context.Context, email Email) (ClassifyResult, error) {
+	if len(cl.prompts) == 0 {
 		return ClassifyResult{}, nil
 	}
 
-	payload := c.buildClassifyPayload(email, prompts)
+	payload := cl.payload(email)
 
 	requestBytes, err := json.Marshal(payload)
 	if err != nil {
@@ -184,25 +270,17 @@ func (c *Client) ClassifyEmailBatch(ctx context.Context, store *db.Store, email
 	}
 	res := ClassifyResult{RequestJSON: string(requestBytes)}
 
-	subject := email.Subject
-	if len(subject) > 60 {
-		subject = subject[:60]
-	}
-	store.Log("INFO", fmt.Sprintf("LLM classifying '%s' against %d rule(s)", subject, len(prompts)))
+	res.log("INFO", fmt.Sprintf("LLM classifying '%s' against %d rule(s)", truncateSubject(email.Subject), len(cl.prompts)))
 
-	raw, err := c.doChat(ctx, payload)
+	raw, err := cl.c.postChat(ctx, requestBytes, cl.c.chatSem)
 	if err != nil {
-		store.Log("ERROR", fmt.Sprintf("LLM request failed: %v", err))
+		res.log("ERROR", fmt.Sprintf("LLM request failed: %v", err))
 		return res, &Error{Msg: fmt.Sprintf("LLM request failed: %v", err)}
 	}
 
-	store.Log("INFO", fmt.Sprintf("LLM classify response: content=%d chars", len(raw)))
+	res.log("INFO", fmt.Sprintf("LLM classify response: content=%d chars", len(raw)))
 	if len(raw) > 0 {
-		preview := raw
-		if len(preview) > 500 {
-			preview = preview[:500]
-		}
-		store.Log("INFO", "LLM raw content: "+preview)
+		res.log("INFO", "LLM raw content: "+truncatePreview(raw))
 	}
 
 	res.RawResponse = raw
@@ -210,59 +288,202 @@ func (c *Client) ClassifyEmailBatch(ctx context.Context, store *db.Store, email
 
 	var parsed map[string]any
 	if err := json.Unmarshal([]byte(raw), &parsed); err != nil {
-		store.Log("ERROR", fmt.Sprintf("LLM parse error: %v | raw: %s", err, raw))
+		res.log("ERROR", fmt.Sprintf("LLM parse error: %v | raw: %s", err, raw))
 		return res, &Error{Msg: fmt.Sprintf("LLM parse error: %v", err)}
 	}
 
-	res.Results = make(map[int64]bool, len(prompts))
+	res.Results = ruleResults(parsed, cl.prompts)
+	return res, nil
+}
+
+// RuleCacheKeys returns one cache key per prompt for email. A key covers the
+// model, the email as sent to it and that rule's name and instructions, so
+// editing one rule leaves the cached decisions for the others valid.
+func (c *Client) RuleCacheKeys(email Email, prompts []Prompt) []string {
+	h := sha256.New()
+	h.Write([]byte(c.model))
+	h.Write([]byte{0})
+	h.Write([]byte(emailText(email)))
+	emailSum := h.Sum(nil)
+
+	keys := make([]string, len(prompts))
+	for i, p := range prompts {
+		h.Reset()
+		h.Write(emailSum)
+		h.Write([]byte(p.Name))
+		h.Write([]byte{0})
+		h.Write([]byte(p.Instructions))
+		keys[i] = hex.EncodeToString(h.Sum(nil))
+	}
+	return keys
+}
+
+// ruleResults maps a {"<rule number>": bool} object onto prompt IDs.
+func ruleResults(parsed map[string]any, prompts []Prompt) map[int64]bool {
+	results := make(map[int64]bool, len(prompts))
 	for k, v := range parsed {
-		var idx int
-		if _, err := fmt.Sscanf(k, "%d", &idx); err != nil {
+		idx, err := strconv.Atoi(strings.TrimSpace(k))
+		if err != nil {
 			continue
 		}
 		idx-- // 1-based to 0-based
 		if idx >= 0 && idx < len(prompts) {
 			b, _ := v.(bool)
-			res.Results[prompts[idx].ID] = b
+			results[prompts[idx].ID] = b
 		}
 	}
-	return res, nil
+	return results
+}
+
+// ClassifyEmails classifies several emails, packing up to the client's batch
+// size of emails (bounded by the context window) into each /api/chat call so the
+// rules prefix is evaluated once per call rather than once per email. The
+// returned slices are index-aligned with emails. Emails missing from, or
+// unparseable in, a batched response are retried one at a time with Classify.
+func (cl *Classifier) ClassifyEmails(ctx context.Context, emails []Email) ([]ClassifyResult, []error) {
+	results := make([]ClassifyResult, len(emails))
+	errs := make([]error, len(emails))
+	if len(cl.prompts) == 0 {
+		return results, errs
+	}
+	for _, r := range cl.emailChunks(emails) {
+		cl.classifyChunk(ctx, emails[r[0]:r[1]], results[r[0]:r[1]], errs[r[0]:r[1]])
+	}
+	return results, errs
+}
+
+// emailChunks splits emails into [start, end) ranges whose combined prompt
+// fits comfortably in num_ctx, assuming roughly 3 characters per token and
+// leaving room for the rules text and the response.
+func (cl *Classifier) emailChunks(emails []Email) [][2]int {
+	budget := cl.c.numCtx*3 - len(cl.rulesText) - 1000 - cl.c.batchSize*len(cl.prompts)*30
+	var chunks [][2]int
+	start, used := 0, 0
+	for i, e := range emails {
+		size := len(e.Sender) + len(e.Subject) + len(emailBody(e)) + 64
+		if i > start && (i-start >= cl.c.batchSize || used+size > budget) {
+			chunks = append(chunks, [2]int{start, i})
+			start, used = i, 0
+		}
+		used += size
+	}
+	if start < len(emails) {
+		chunks = append(chunks, [2]int{start, len(emails)})
+	}
+	return chunks
+}
+
+func (cl *Classifier) classifyChunk(ctx context.Context, emails []Email, results []ClassifyResult, errs []error) {
+	if len(emails) == 1 {
+		results[0], errs[0] = cl.Classify(ctx, emails[0])
+		return
+	}
+
+	payload := cl.multiPayload(emails)
+	requestBytes, err := json.Marshal(payload)
+	if err != nil {
+		requestBytes = []byte("{}")
+	}
+	requestJSON := string(requestBytes)
+	for i, e := range emails {
+		results[i] = ClassifyResult{RequestJSON: requestJSON}
+		results[i].log("INFO", fmt.Sprintf("LLM classifying '%s' against %d rule(s) (%d emails in request)",
+			truncateSubject(e.Subject), len(cl.prompts), len(emails)))
+	}
+
+	raw, err := cl.c.postChat(ctx, requestBytes, cl.c.chatSem)
+	if err != nil {
+		for i := range emails {
+			results[i].log("ERROR", fmt.Sprintf("LLM request failed: %v", err))
+			errs[i] = &Error{Msg: fmt.Sprintf("LLM request failed: %v", err)}
+		}
+		return
+	}
+
+	var parsed map[string]json.RawMessage
+	if err := json.Unmarshal([]byte(strings.TrimSpace(fenceRe.ReplaceAllString(raw, ""))), &parsed); err != nil {
+		parsed = nil
+	}
+	for i, e := range emails {
+		var flags map[string]any
+		sub, ok := parsed[strconv.Itoa(i+1)]
+		if !ok || json.Unmarshal(sub, &flags) != nil {
+			warn := db.LogEntry{
+				Timestamp: db.Now(),
+				Level:     "WARNING",
+				Message:   "LLM batch response had no usable entry for this email, retrying it alone",
+			}
+			single, err := cl.Classify(ctx, e)
+			single.Logs = slices.Concat(results[i].Logs, []db.LogEntry{warn}, single.Logs)
+			results[i], errs[i] = single, err
+			continue
+		}
+		results[i].RawResponse = string(sub)
+		results[i].Results = ruleResults(flags, cl.prompts)
+		results[i].log("INFO", "LLM raw content: "+truncatePreview(results[i].RawResponse))
+	}
 }
 
-func buildBody(email Email, prompts []Prompt) string {
+func buildRulesText(prompts []Prompt) string {
 	var sb strings.Builder
 	for i, p := range prompts {
 		fmt.Fprintf(&sb, "%d. %s: %s\n", i+1, p.Name, p.Instructions)
 	}
-	rulesText := sb.String()
+	return sb.String()
+}
 
-	exampleParts := make([]string, min(2, len(prompts)))
-	for i := range exampleParts {
-		exampleParts[i] = fmt.Sprintf(`"%d": false`, i+1)
+// emailBody returns the text sent to the model for an email, falling back to
+// the snippet when the body is empty. Bodies are normalized when fetched.
+func emailBody(email Email) string {
+	if email.Body == "" {
+		return email.Snippet
 	}
+	return email.Body
+}
+
+func truncateSubject(subject string) string {
+	if len(subject) > 60 {
+		return subject[:60]
+	}
+	return subject
+}
+
+func truncatePreview(raw string) string {
+	if len(raw) > 500 {
+		return raw[:500]
+	}
+	return raw
+}
 
-	body := email.Body
-	if body == "" {
-		body = email.Snippet
+// body is the single-email prompt: the shared prefix followed by the email.
+func (cl *Classifier) body(email Email) string {
+	return cl.prefix + emailText(email)
+}
+
+// emailText is an email as presented to the model.
+func emailText(email Email) string {
+	return fmt.Sprintf("From: %s\nSubject: %s\nBody:\n%s", email.Sender, email.Subject, emailBody(email))
+}
+
+// multiBody is body for several emails; the rules come first so the prefix
+// is shared, and the model answers with one nested object per email.
+func (cl *Classifier) multiBody(emails []Email) string {
+	var sb strings.Builder
+	for i, e := range emails {
+		fmt.Fprintf(&sb, "\n--- Email %d ---\nFrom: %s\nSubject: %s\nBody:\n%s\n", i+1, e.Sender, e.Subject, emailBody(e))
 	}
-	body = strings.ReplaceAll(body, "\r", "")
-	body = blankRunRe.ReplaceAllString(body, "\n\n")
 
-	return fmt.Sprintf(`You are an email classification assistant. For each rule below, decide if the label should be applied to the email that follows.
+	return fmt.Sprintf(`You are an email classification assistant. For each email below, decide for each rule whether its label should be applied to that email.
 
 Rules:
 %s
-Respond with ONLY a JSON object where each key is the rule's number (1, 2, 3...) and the value is true or false.
-Example: {%s}
+Respond with ONLY a JSON object where each key is the email's number (1 to %d) and each value is an object whose keys are the rule numbers (1, 2, 3...) and whose values are true or false.
+Example: %s
 No explanation, no markdown, just the JSON object.
 
-Email:
-From: %s
-Subject: %s
-Body:
+Emails:
 %s`,
-		rulesText, strings.Join(exampleParts, ", "),
-		email.Sender, email.Subject, body)
+		cl.rulesText, len(emails), cl.multiExample, sb.String())
 }
 
 // ============================================================
@@ -330,7 +551,7 @@ func (c *Client) streamGenerate(ctx context.Context, description string, ch chan
 	if err != nil {
 		return err
 	}
-	defer func() { _ = resp.Body.Close() }()
+	defer closeBody(resp)
 
 	scanner := bufio.NewScanner(resp.Body)
 	for scanner.Scan() {
@@ -467,21 +688,68 @@ func (c *Client) doChat(ctx context.Context, payload map[string]any) (string, er
 	if err != nil {
 		return "", err
 	}
+	return c.postChat(ctx, body, nil)
+}
+
+// chatRetries is how many times a chat request is retried after a failed
+// connection or a 502/503 from Ollama, waiting chatRetryBackoff, then twice
+// that, between attempts. Timeouts are not retried.
+const (
+	chatRetries      = 2
+	chatRetryBackoff = 300 * time.Millisecond
+)
+
+// postChat sends an already-encoded /api/chat request, so callers that keep
+// the request JSON for debugging do not encode the payload twice. A non-nil
+// sem is held for each attempt, not across the backoff between them.
+func (c *Client) postChat(ctx context.Context, body []byte, sem chan struct{}) (string, error) {
+	backoff := chatRetryBackoff
+	for attempt := 0; ; attempt++ {
+		if sem != nil {
+			select {
+			case sem <- struct{}{}:
+			case <-ctx.Done():
+				return "", ctx.Err()
+			}
+		}
+		content, retry, err := c.postChatOnce(ctx, body)
+		if sem != nil {
+			<-sem
+		}
+		if err == nil || !retry || attempt == chatRetries {
+			return content, err
+		}
+		slog.Debug("ollama chat failed, retrying", "attempt", attempt+1, "err", err)
+		select {
+		case <-time.After(backoff):
+		case <-ctx.Done():
+			return "", ctx.Err()
+		}
+		backoff *= 2
+	}
+}
+
+// postChatOnce makes one /api/chat call; retry reports whether a failure is
+// worth another attempt.
+func (c *Client) postChatOnce(ctx context.Context, body []byte) (content string, retry bool, err error) {
 	req, err := http.NewRequestWithContext(ctx, http.MethodPost, c.host+"/api/chat", bytes.NewReader(body))
 	if err != nil {
-		return "", err
+		return "", false, err
 	}
 	req.Header.Set("Content-Type", "application/json")
 
 	resp, err := c.httpClient.Do(req)
 	if err != nil {
-		return "", err
+		var netErr net.Error
+		timeout := errors.As(err, &netErr) && netErr.Timeout()
+		return "", !timeout && ctx.Err() == nil, err
 	}
-	defer func() { _ = resp.Body.Close() }()
+	defer closeBody(resp)
 
 	if resp.StatusCode != http.StatusOK {
 		b, _ := io.ReadAll(resp.Body)
-		return "", fmt.Errorf("ollama %d: %s", resp.StatusCode, string(b))
+		retry = resp.StatusCode == http.StatusBadGateway || resp.StatusCode == http.StatusServiceUnavailable
+		return "", retry, fmt.Errorf("ollama %d: %s", resp.StatusCode, string(b))
 	}
 
 	var result struct {
@@ -490,7 +758,7 @@ func (c *Client) doChat(ctx context.Context, payload map[string]any) (string, er
 		} `json:"message"`
 	}
 	if err := json.NewDecoder(resp.Body).Decode(&result); err != nil {
-		return "", err
+		return "", false, err
 	}
-	return result.Message.Content, nil
+	return result.Message.Content, false, nil
 }
@@ -0,0 +1,237 @@
+package llm
+
+import (
+	"context"
+	"encoding/json"
+	"maps"
+	"net/http"
+	"net/http/httptest"
+	"slices"
+	"strings"
+	"sync"
+	"testing"
+	"time"
+)
+
+var testPrompts = []Prompt{{ID: 10, Name: "A"}, {ID: 20, Name: "B"}}
+
+func TestRuleResults(t *testing.T) {
+	tests := []struct {
+		name   string
+		parsed map[string]any
+		want   map[int64]bool
+	}{
+		{
+			name:   "numbered keys",
+			parsed: map[string]any{"1": true, "2": false},
+			want:   map[int64]bool{10: true, 20: false},
+		},
+		{
+			name:   "extra and out-of-range keys are ignored",
+			parsed: map[string]any{"1": true, "3": true, "0": true, "x": true},
+			want:   map[int64]bool{10: true},
+		},
+		{
+			name:   "key whitespace is trimmed",
+			parsed: map[string]any{" 2 ": true},
+			want:   map[int64]bool{20: true},
+		},
+		{
+			name:   "non-bool value is false",
+			parsed: map[string]any{"1": "yes", "2": 1.0},
+			want:   map[int64]bool{10: false, 20: false},
+		},
+	}
+
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			if got := ruleResults(tc.parsed, testPrompts); !maps.Equal(got, tc.want) {
+				t.Errorf("ruleResults = %v, want %v", got, tc.want)
+			}
+		})
+	}
+}
+
+func TestEmailChunks(t *testing.T) {
+	small := Email{Subject: "s", Body: "b"}
+	big := Email{Subject: "s", Body: strings.Repeat("x", 5000)}
+
+	tests := []struct {
+		name      string
+		numCtx    int
+		batchSize int
+		emails    []Email
+		want      [][2]int
+	}{
+		{
+			name:      "empty",
+			numCtx:    8192,
+			batchSize: 4,
+			want:      nil,
+		},
+		{
+			name:      "split by batch size",
+			numCtx:    8192,
+			batchSize: 2,
+			emails:    []Email{small, small, small, small, small},
+			want:      [][2]int{{0, 2}, {2, 4}, {4, 5}},
+		},
+		{
+			name:      "split by context budget",
+			numCtx:    2048,
+			batchSize: 4,
+			emails:    []Email{small, big, small},
+			want:      [][2]int{{0, 1}, {1, 2}, {2, 3}},
+		},
+		{
+			name:      "oversized email still gets its own chunk",
+			numCtx:    512,
+			batchSize: 4,
+			emails:    []Email{big, big},
+			want:      [][2]int{{0, 1}, {1, 2}},
+		},
+	}
+
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			c := NewClient("http://ollama", "m", tc.numCtx, tc.batchSize, time.Second)
+			got := c.NewClassifier(testPrompts).emailChunks(tc.emails)
+			if !slices.Equal(got, tc.want) {
+				t.Errorf("emailChunks = %v, want %v", got, tc.want)
+			}
+		})
+	}
+}
+
+// fakeOllama answers /api/chat with batch for multi-email requests and with
+// single for one-email requests, recording the subjects classified alone.
+func fakeOllama(t *testing.T, batch, single string) (*httptest.Server, func() []string) {
+	t.Helper()
+	var mu sync.Mutex
+	var alone []string
+	srv := httptest.NewServer(http.HandlerFunc(func(w http.ResponseWriter, r *http.Request) {
+		var req struct {
+			Messages []struct {
+				Content string `json:"content"`
+			} `json:"messages"`
+		}
+		if err := json.NewDecoder(r.Body).Decode(&req); err != nil || len(req.Messages) == 0 {
+			http.Error(w, "bad request", http.StatusBadRequest)
+			return
+		}
+		content := batch
+		if prompt := req.Messages[0].Content; !strings.Contains(prompt, "--- Email 1 ---") {
+			content = single
+			mu.Lock()
+			alone = append(alone, prompt[strings.LastIndex(prompt, "Subject: ")+len("Subject: "):strings.LastIndex(prompt, "\nBody:")])
+			mu.Unlock()
+		}
+		var resp struct {
+			Message struct {
+				Content string `json:"content"`
+			} `json:"message"`
+		}
+		resp.Message.Content = content
+		_ = json.NewEncoder(w).Encode(resp)
+	}))
+	t.Cleanup(srv.Close)
+	return srv, func() []string {
+		mu.Lock()
+		defer mu.Unlock()
+		return slices.Clone(alone)
+	}
+}
+
+func TestClassifyEmails(t *testing.T) {
+	emails := []Email{{Subject: "one"}, {Subject: "two"}}
+
+	tests := []struct {
+		name      string
+		batch     string
+		single    string
+		want      []map[int64]bool
+		wantAlone []string
+	}{
+		{
+			name:  "every email answered",
+			batch: `{"1": {"1": true, "2": false}, "2": {"1": false, "2": true}}`,
+			want:  []map[int64]bool{{10: true, 20: false}, {10: false, 20: true}},
+		},
+		{
+			name:  "extra keys are ignored",
+			batch: "```json\n" + `{"1": {"1": true, "3": true}, "2": {"2": true}, "3": {"1": true}, "note": "x"}` + "\n```",
+			want:  []map[int64]bool{{10: true}, {20: true}},
+		},
+		{
+			name:      "missing entry is retried alone",
+			batch:     `{"1": {"1": true, "2": true}}`,
+			single:    `{"1": false, "2": true}`,
+			want:      []map[int64]bool{{10: true, 20: true}, {10: false, 20: true}},
+			wantAlone: []string{"two"},
+		},
+		{
+			name:      "non-object entry is retried alone",
+			batch:     `{"1": true, "2": {"1": true}}`,
+			single:    `{"1": true, "2": false}`,
+			want:      []map[int64]bool{{10: true, 20: false}, {10: true}},
+			wantAlone: []string{"one"},
+		},
+		{
+			name:      "unparseable response retries every email",
+			batch:     `not json`,
+			single:    `{"2": true}`,
+			want:      []map[int64]bool{{20: true}, {20: true}},
+			wantAlone: []string{"one", "two"},
+		},
+	}
+
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			srv, alone := fakeOllama(t, tc.batch, tc.single)
+			c := NewClient(srv.URL, "m", 8192, 4, 5*time.Second)
+			results, errs := c.NewClassifier(testPrompts).ClassifyEmails(context.Background(), emails)
+
+			for i := range emails {
+				if errs[i] != nil {
+					t.Fatalf("email %d: %v", i, errs[i])
+				}
+				if !maps.Equal(results[i].Results, tc.want[i]) {
+					t.Errorf("email %d results = %v, want %v", i, results[i].Results, tc.want[i])
+				}
+				if results[i].RequestJSON == "" {
+					t.Errorf("email %d has no request JSON", i)
+				}
+			}
+			if got := alone(); !slices.Equal(got, tc.wantAlone) {
+				t.Errorf("classified alone = %q, want %q", got, tc.wantAlone)
+			}
+		})
+	}
+}
+
+func TestClassifyEmailsFallbackLogOrder(t *testing.T) {
+	srv, _ := fakeOllama(t, `{"1": {"1": true}}`, `{"1": true}`)
+	c := NewClient(srv.URL, "m", 8192, 4, 5*time.Second)
+	results, _ := c.NewClassifier(testPrompts).ClassifyEmails(context.Background(), []Email{{Subject: "one"}, {Subject: "two"}})
+
+	logs := results[1].Logs
+	if len(logs) < 3 {
+		t.Fatalf("got %d log entries, want at least 3: %+v", len(logs), logs)
+	}
+	want := []struct{ level, contains string }{
+		{"INFO", "(2 emails in request)"},
+		{"WARNING", "retrying it alone"},
+		{"INFO", "LLM classifying 'two' against 2 rule(s)"},
+	}
+	for i, w := range want {
+		if logs[i].Level != w.level || !strings.Contains(logs[i].Message, w.contains) {
+			t.Errorf("log %d = %s %q, want %s containing %q", i, logs[i].Level, logs[i].Message, w.level, w.contains)
+		}
+	}
+	if strings.Contains(logs[2].Message, "emails in request") {
+		t.Errorf("single-call log %q still carries the batch count", logs[2].Message)
+	}
+	if results[1].RawResponse != `{"1": true}` {
+		t.Errorf("RawResponse = %q, want the single-call response", results[1].RawResponse)
+	}
+}
@@ -36,6 +36,8 @@ func main() {
 		log.Fatalf("open db: %v", err)
 	}
 	defer func() { _ = store.Close() }()
+	store.SetDebugLogging(cfg.DebugLogging)
+	store.SetLogRetention(cfg.LogRetentionDays)
 
 	if err := store.Migrate(); err != nil {
 		log.Fatalf("migrate db: %v", err) //nolint:gocritic // OS reclaims file handle on Fatalf
@@ -53,7 +55,7 @@ func main() {
 	}
 
 	// LLM client
-	ollamaClient := llm.NewClient(cfg.OllamaHost, cfg.OllamaModel, cfg.OllamaNumCtx, time.Duration(cfg.OllamaTimeout)*time.Second)
+	ollamaClient := llm.NewClient(cfg.OllamaHost, cfg.OllamaModel, cfg.OllamaNumCtx, cfg.OllamaBatchSize, time.Duration(cfg.OllamaTimeout)*time.Second)
 
 	// Pull model in background
 	go func() {
@@ -91,6 +93,7 @@ func main() {
 		BodyTruncation: cfg.EmailBodyTrunc,
 		LogRetention:   cfg.LogRetentionDays,
 		DebugLogging:   cfg.DebugLogging,
+		Workers:        cfg.PollWorkers,
 	})
 	p.Start()
 
@@ -3,8 +3,10 @@ package poller
 import (
 	"context"
 	"log/slog"
+	"math/rand"
 	"strconv"
 	"sync"
+	"sync/atomic"
 	"time"
 
 	"github.com/sloccy/ollamail/db"
@@ -30,8 +32,13 @@ type Poller struct {
 	lastCleanup time.Time
 
 	scanMu  sync.Mutex    // non-blocking try-lock for scan exclusion
+	running atomic.Bool   // true while runScan holds scanMu
 	resetCh chan struct{} // signals loop to reset the timer after interval change
 
+	// status is the formatted snapshot served by GetStatus, rebuilt by
+	// publishStatus whenever lastRun, nextRun or running change.
+	status atomic.Pointer[Status]
+
 	cancel context.CancelFunc
 }
 
@@ -42,6 +49,8 @@ type Config struct {
 	BodyTruncation int
 	LogRetention   int
 	DebugLogging   bool
+	// Workers bounds how many accounts are scanned in parallel.
+	Workers int
 }
 
 // Status is returned by GetStatus.
@@ -78,6 +87,7 @@ func (p *Poller) Start() {
 
 	p.mu.Lock()
 	p.nextRun = time.Now()
+	p.publishStatus()
 	p.mu.Unlock()
 
 	loopCtx, cancel := context.WithCancel(context.Background())
@@ -102,6 +112,7 @@ func (p *Poller) UpdateInterval(seconds int) {
 	p.mu.Lock()
 	p.interval = time.Duration(seconds) * time.Second
 	p.nextRun = p.lastRun.Add(p.interval)
+	p.publishStatus()
 	p.mu.Unlock()
 	// Signal loop to reset the timer so the new interval takes effect immediately.
 	select {
@@ -110,10 +121,16 @@ func (p *Poller) UpdateInterval(seconds int) {
 	}
 }
 
-// GetStatus returns current poller state.
+// GetStatus returns current poller state without taking any lock.
 func (p *Poller) GetStatus() Status {
-	p.mu.RLock()
-	defer p.mu.RUnlock()
+	if st := p.status.Load(); st != nil {
+		return *st
+	}
+	return Status{}
+}
+
+// publishStatus swaps in a fresh status snapshot. Callers must hold p.mu.
+func (p *Poller) publishStatus() {
 	var lastRun, nextRun string
 	if !p.lastRun.IsZero() {
 		lastRun = p.lastRun.Local().Format("2006-01-02 15:04:05")
@@ -121,15 +138,11 @@ func (p *Poller) GetStatus() Status {
 	if !p.nextRun.IsZero() {
 		nextRun = p.nextRun.Local().Format("2006-01-02 15:04:05")
 	}
-	running := !p.scanMu.TryLock()
-	if !running {
-		p.scanMu.Unlock()
-	}
-	return Status{
-		Running: running,
+	p.status.Store(&Status{
+		Running: p.running.Load(),
 		LastRun: lastRun,
 		NextRun: nextRun,
-	}
+	})
 }
 
 func (p *Poller) loop(ctx context.Context) {
@@ -162,19 +175,37 @@ func (p *Poller) loop(ctx context.Context) {
 		case <-timer.C:
 			p.runScan()
 			p.mu.Lock()
-			d = p.interval
-			p.nextRun = time.Now().Add(p.interval)
+			d = jitter(p.interval)
+			p.nextRun = time.Now().Add(d)
+			p.publishStatus()
 			p.mu.Unlock()
 			timer.Reset(d)
 		}
 	}
 }
 
+// jitter spreads d by up to ±10% so scans do not settle into lockstep with
+// other periodic load on Gmail or Ollama.
+func jitter(d time.Duration) time.Duration {
+	spread := int64(d / 10)
+	if spread <= 0 {
+		return d
+	}
+	return d + time.Duration(rand.Int63n(2*spread+1)-spread) //nolint:gosec // G404: crypto rand unnecessary for jitter
+}
+
 func (p *Poller) runScan() {
 	if !p.scanMu.TryLock() {
 		return // scan already running
 	}
 	defer p.scanMu.Unlock()
+	p.running.Store(true)
+	defer func() {
+		p.running.Store(false)
+		p.mu.Lock()
+		p.publishStatus()
+		p.mu.Unlock()
+	}()
 
 	now := time.Now()
 	p.mu.Lock()
@@ -183,14 +214,16 @@ func (p *Poller) runScan() {
 	if doCleanup {
 		p.lastCleanup = now
 	}
+	p.publishStatus()
 	p.mu.Unlock()
 
 	ctx := context.Background()
 
 	if doCleanup {
-		_ = p.store.TrimLogs(ctx, p.cfg.LogRetention)
 		_ = p.store.TrimProcessedEmails(ctx, p.cfg.LookbackHours)
 		_ = p.store.TrimHistory(ctx, p.cfg.LogRetention)
+		_ = p.store.TrimLlmCache(ctx)
+		_ = p.store.Optimize(ctx)
 	}
 
 	accounts, err := p.store.ListAccounts(ctx)
@@ -212,18 +245,38 @@ func (p *Poller) runScan() {
 		DebugLogging:   p.cfg.DebugLogging,
 	}
 
+	// Account scans mostly wait on Gmail and Ollama, so run several at once;
+	// the LLM client bounds how many chat requests reach Ollama.
+	sem := make(chan struct{}, max(1, p.cfg.Workers))
+	var wg sync.WaitGroup
 	for _, account := range accounts {
 		if account.Active == 0 {
 			continue
 		}
-		wrapper, err := processor.ProcessAccount(ctx, p.store, p.ollamaClient, p.gmailAuth, account, prompts, procCfg)
-		if err != nil {
-			slog.Error("process account", "email", account.Email, "err", err)
-			p.store.Log("ERROR", "Scan failed for "+account.Email+": "+err.Error())
-			continue
-		}
-		if wrapper != nil {
-			retention.Cleanup(ctx, p.store, wrapper.Svc, account.ID)
-		}
+		wg.Add(1)
+		sem <- struct{}{}
+		go func() {
+			defer wg.Done()
+			defer func() { <-sem }()
+			p.scanAccount(ctx, account, prompts, procCfg)
+		}()
+	}
+	wg.Wait()
+
+	// A scan is the burst of writes; checkpoint now, while the app is idle.
+	if err := p.store.Checkpoint(ctx); err != nil {
+		slog.Warn("wal checkpoint", "err", err)
+	}
+}
+
+func (p *Poller) scanAccount(ctx context.Context, account db.Account, prompts []db.Prompt, procCfg processor.ProcessConfig) {
+	wrapper, err := processor.ProcessAccount(ctx, p.store, p.ollamaClient, p.gmailAuth, account, prompts, procCfg)
+	if err != nil {
+		slog.Error("process account", "email", account.Email, "err", err)
+		p.store.Log("ERROR", "Scan failed for "+account.Email+": "+err.Error())
+		return
+	}
+	if wrapper != nil {
+		retention.Cleanup(ctx, p.store, wrapper.Svc, account.ID)
 	}
 }
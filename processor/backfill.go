@@ -58,7 +58,7 @@ func BackfillLlmDebug(ctx context.Context, store *db.Store, ollamaClient *llm.Cl
 			slog.Warn("backfill: get account", "account_id", h.AccountID, "err", err)
 			continue
 		}
-		svc, prompts, err := setupAccountContext(ctx, store, gmailAuth, account, allPrompts)
+		svc, prompts, err := setupAccountContext(store, gmailAuth, account, allPrompts)
 		if err != nil {
 			slog.Warn("backfill: setup account", "account", account.Email, "err", err)
 			continue
@@ -99,19 +99,12 @@ func BackfillLlmDebug(ctx context.Context, store *db.Store, ollamaClient *llm.Cl
 
 		gmailRaw := marshalGmailDebug(msg)
 
-		var llmRequest string
-		if len(entry.prompts) > 0 {
-			llmPrompts := make([]llm.Prompt, len(entry.prompts))
-			for j, p := range entry.prompts {
-				llmPrompts[j] = llm.Prompt{ID: p.ID, Name: p.Name, Instructions: p.Instructions}
-			}
-			llmRequest = ollamaClient.BuildClassifyRequestJSON(llm.Email{
-				Sender:  msg.Sender,
-				Subject: msg.Subject,
-				Body:    msg.Body,
-				Snippet: msg.Snippet,
-			}, llmPrompts)
-		}
+		llmRequest := ollamaClient.BuildClassifyRequestJSON(llm.Email{
+			Sender:  msg.Sender,
+			Subject: msg.Subject,
+			Body:    msg.Body,
+			Snippet: msg.Snippet,
+		}, toLLMPrompts(entry.prompts))
 
 		if llmRequest == "" {
 			slog.Warn("backfill: no prompts for account, skipping", "message_id", h.MessageID)
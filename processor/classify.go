@@ -0,0 +1,160 @@
+package processor
+
+import (
+	"context"
+	"fmt"
+	"log/slog"
+	"maps"
+	"regexp"
+	"strconv"
+	"strings"
+
+	"github.com/sloccy/ollamail/db"
+	gmailpkg "github.com/sloccy/ollamail/gmail"
+	"github.com/sloccy/ollamail/llm"
+)
+
+// classification is the LLM outcome for one message.
+type classification struct {
+	result llm.ClassifyResult
+	err    error
+	// cache holds the llm_cache rows to write for fresh rule decisions.
+	cache []db.PutLlmCacheParams
+}
+
+// classifyMessages classifies msgs against prompts. Prefilters are applied
+// first, then per-rule decisions cached in llm_cache; emails needing the same
+// remaining rules share LLM calls.
+func classifyMessages(
+	ctx context.Context,
+	store *db.Store,
+	ollamaClient *llm.Client,
+	msgs []gmailpkg.Message,
+	prompts []db.Prompt,
+	filters map[int64]*regexp.Regexp,
+) []classification {
+	out := make([]classification, len(msgs))
+	decided := make([]map[int64]bool, len(msgs))
+	emails := make([]llm.Email, len(msgs))
+	remaining := make([][]db.Prompt, len(msgs))
+	ruleKeys := make([][]string, len(msgs))
+	var allKeys []string
+	for i, msg := range msgs {
+		emails[i] = llm.Email{Sender: msg.Sender, Subject: msg.Subject, Body: msg.Body, Snippet: msg.Snippet}
+		decided[i], remaining[i] = applyPrefilters(msg, prompts, filters)
+		ruleKeys[i] = ollamaClient.RuleCacheKeys(emails[i], toLLMPrompts(remaining[i]))
+		allKeys = append(allKeys, ruleKeys[i]...)
+	}
+
+	cached, err := store.GetLlmCacheEntries(ctx, allKeys)
+	if err != nil {
+		slog.Warn("read llm cache", "err", err)
+	}
+
+	// Split each message's rules into cached decisions and ones for the LLM
+	groups := make(map[string][]int)
+	groupPrompts := make(map[string][]db.Prompt)
+	var order []string
+	for i := range msgs {
+		d, hits, uncached, uncachedKeys := splitCached(remaining[i], ruleKeys[i], cached, decided[i])
+		decided[i] = d
+		if len(hits) > 0 {
+			out[i].result.Logs = append(out[i].result.Logs, db.LogEntry{
+				Timestamp: db.Now(),
+				Level:     "INFO",
+				Message: fmt.Sprintf("LLM cache hit for '%s' (%d of %d rule(s)): %s",
+					gmailpkg.Truncate(msgs[i].Subject, 60), len(hits), len(remaining[i]), cachedSummary(hits, decided[i])),
+			})
+		}
+		remaining[i], ruleKeys[i] = uncached, uncachedKeys
+		if len(uncached) == 0 {
+			continue
+		}
+		key := promptSetKey(uncached)
+		if _, ok := groups[key]; !ok {
+			order = append(order, key)
+			groupPrompts[key] = uncached
+		}
+		groups[key] = append(groups[key], i)
+	}
+
+	for _, key := range order {
+		classifier := ollamaClient.NewClassifier(toLLMPrompts(groupPrompts[key]))
+		idx := groups[key]
+		batch := make([]llm.Email, len(idx))
+		for j, i := range idx {
+			batch[j] = emails[i]
+		}
+
+		results, errs := classifier.ClassifyEmails(ctx, batch)
+		for j, i := range idx {
+			hitLogs := out[i].result.Logs
+			out[i].result, out[i].err = results[j], errs[j]
+			out[i].result.Logs = append(hitLogs, out[i].result.Logs...)
+			if errs[j] != nil {
+				continue
+			}
+			for n, p := range remaining[i] {
+				if v, ok := results[j].Results[p.ID]; ok {
+					out[i].cache = append(out[i].cache, db.PutLlmCacheParams{
+						Key:      ruleKeys[i][n],
+						Response: strconv.FormatBool(v),
+					})
+				}
+			}
+		}
+	}
+
+	for i := range out {
+		if len(decided[i]) == 0 {
+			continue
+		}
+		if out[i].result.Results == nil {
+			out[i].result.Results = make(map[int64]bool, len(decided[i]))
+		}
+		maps.Copy(out[i].result.Results, decided[i])
+	}
+	return out
+}
+
+// splitCached separates prompts (with their index-aligned cache keys) into
+// rules answered by cached and rules that still need the LLM. Cached
+// decisions are added to decided, which is allocated if nil and returned.
+func splitCached(
+	prompts []db.Prompt,
+	keys []string,
+	cached map[string]string,
+	decided map[int64]bool,
+) (outDecided map[int64]bool, hits, uncached []db.Prompt, uncachedKeys []string) {
+	for j, p := range prompts {
+		resp, ok := cached[keys[j]]
+		if !ok {
+			uncached = append(uncached, p)
+			uncachedKeys = append(uncachedKeys, keys[j])
+			continue
+		}
+		if decided == nil {
+			decided = make(map[int64]bool)
+		}
+		decided[p.ID], _ = strconv.ParseBool(resp)
+		hits = append(hits, p)
+	}
+	return decided, hits, uncached, uncachedKeys
+}
+
+// cachedSummary lists cache-decided rules as "name=true, name=false".
+func cachedSummary(hits []db.Prompt, decided map[int64]bool) string {
+	parts := make([]string, len(hits))
+	for i, p := range hits {
+		parts[i] = p.Name + "=" + strconv.FormatBool(decided[p.ID])
+	}
+	return strings.Join(parts, ", ")
+}
+
+func toLLMPrompts(prompts []db.Prompt) []llm.Prompt {
+	out := make([]llm.Prompt, len(prompts))
+	for i, p := range prompts {
+		out[i] = llm.Prompt{ID: p.ID, Name: p.Name, Instructions: p.Instructions}
+	}
+	return out
+}
@@ -0,0 +1,98 @@
+package processor
+
+import (
+	"maps"
+	"slices"
+	"testing"
+
+	"github.com/sloccy/ollamail/db"
+)
+
+func TestSplitCached(t *testing.T) {
+	a := db.Prompt{ID: 1, Name: "A"}
+	b := db.Prompt{ID: 2, Name: "B"}
+	c := db.Prompt{ID: 3, Name: "C"}
+
+	tests := []struct {
+		name         string
+		prompts      []db.Prompt
+		keys         []string
+		cached       map[string]string
+		decided      map[int64]bool
+		wantDecided  map[int64]bool
+		wantHits     []int64
+		wantUncached []int64
+		wantKeys     []string
+	}{
+		{
+			name:         "nothing cached",
+			prompts:      []db.Prompt{a, b},
+			keys:         []string{"ka", "kb"},
+			cached:       map[string]string{},
+			wantUncached: []int64{1, 2},
+			wantKeys:     []string{"ka", "kb"},
+		},
+		{
+			name:        "all cached",
+			prompts:     []db.Prompt{a, b},
+			keys:        []string{"ka", "kb"},
+			cached:      map[string]string{"ka": "true", "kb": "false"},
+			wantDecided: map[int64]bool{1: true, 2: false},
+			wantHits:    []int64{1, 2},
+		},
+		{
+			name:         "mixed keeps uncached keys aligned",
+			prompts:      []db.Prompt{a, b, c},
+			keys:         []string{"ka", "kb", "kc"},
+			cached:       map[string]string{"kb": "true"},
+			wantDecided:  map[int64]bool{2: true},
+			wantHits:     []int64{2},
+			wantUncached: []int64{1, 3},
+			wantKeys:     []string{"ka", "kc"},
+		},
+		{
+			name:         "prefilter decisions are kept",
+			prompts:      []db.Prompt{a, b},
+			keys:         []string{"ka", "kb"},
+			cached:       map[string]string{"ka": "false"},
+			decided:      map[int64]bool{9: true},
+			wantDecided:  map[int64]bool{9: true, 1: false},
+			wantHits:     []int64{1},
+			wantUncached: []int64{2},
+			wantKeys:     []string{"kb"},
+		},
+		{
+			name:         "nil cache map",
+			prompts:      []db.Prompt{a},
+			keys:         []string{"ka"},
+			wantUncached: []int64{1},
+			wantKeys:     []string{"ka"},
+		},
+	}
+
+	ids := func(ps []db.Prompt) []int64 {
+		var out []int64
+		for _, p := range ps {
+			out = append(out, p.ID)
+		}
+		return out
+	}
+
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			decided, hits, uncached, keys := splitCached(tc.prompts, tc.keys, tc.cached, tc.decided)
+			if !maps.Equal(decided, tc.wantDecided) {
+				t.Errorf("decided = %v, want %v", decided, tc.wantDecided)
+			}
+			if got := ids(hits); !slices.Equal(got, tc.wantHits) {
+				t.Errorf("hits = %v, want %v", got, tc.wantHits)
+			}
+			if got := ids(uncached); !slices.Equal(got, tc.wantUncached) {
+				t.Errorf("uncached = %v, want %v", got, tc.wantUncached)
+			}
+			if !slices.Equal(keys, tc.wantKeys) {
+				t.Errorf("uncached keys = %v, want %v", keys, tc.wantKeys)
+			}
+		})
+	}
+}
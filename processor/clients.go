@@ -0,0 +1,71 @@
+package processor
+
+import (
+	"context"
+	"fmt"
+	"sync"
+
+	"github.com/sloccy/ollamail/db"
+	gmailpkg "github.com/sloccy/ollamail/gmail"
+)
+
+type gmailClientEntry struct {
+	creds string
+	svc   *gmailpkg.Client
+}
+
+// gmailClients keeps each account's Gmail client between scans so its OAuth
+// token source (and the access token it holds) is reused. An entry is only
+// used while the account's stored credentials match; a token refresh
+// updates the entry along with the database. ForgetAccount removes it.
+var gmailClients = struct {
+	sync.Mutex
+	m map[int64]*gmailClientEntry
+}{m: make(map[int64]*gmailClientEntry)}
+
+// accountClient returns the cached Gmail client for account, creating one
+// when there is none or the account's credentials have changed.
+func accountClient(store *db.Store, gmailAuth *gmailpkg.Auth, account db.Account) (*gmailpkg.Client, error) {
+	gmailClients.Lock()
+	entry, ok := gmailClients.m[account.ID]
+	if ok && entry.creds == account.CredentialsJson {
+		gmailClients.Unlock()
+		return entry.svc, nil
+	}
+	gmailClients.Unlock()
+
+	oauthCfg, err := gmailAuth.ConfigFromFile()
+	if err != nil {
+		return nil, fmt.Errorf("load oauth config: %w", err)
+	}
+	entry = &gmailClientEntry{creds: account.CredentialsJson}
+	// The client outlives this scan, so it must not hold the scan's context
+	svc, err := gmailpkg.NewService(context.Background(), account.CredentialsJson, oauthCfg, func(newCreds string) {
+		gmailClients.Lock()
+		entry.creds = newCreds
+		gmailClients.Unlock()
+		_ = store.UpdateAccountCredentials(context.Background(), db.UpdateAccountCredentialsParams{
+			CredentialsJson: newCreds,
+			ID:              account.ID,
+		})
+	})
+	if err != nil {
+		return nil, fmt.Errorf("create gmail service: %w", err)
+	}
+	entry.svc = svc
+
+	gmailClients.Lock()
+	gmailClients.m[account.ID] = entry
+	gmailClients.Unlock()
+	return svc, nil
+}
+
+// ForgetAccount drops the cached Gmail client and label map for an account.
+// Call it when the account is deleted or re-authorized so the old token
+// source is not kept alive.
+func ForgetAccount(accountID int64) {
+	gmailClients.Lock()
+	delete(gmailClients.m, accountID)
+	gmailClients.Unlock()
+	invalidateLabels(accountID)
+}
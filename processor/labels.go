@@ -0,0 +1,63 @@
+package processor
+
+import (
+	"context"
+	"sync"
+	"time"
+
+	gmailpkg "github.com/sloccy/ollamail/gmail"
+)
+
+// labelCacheTTL bounds how long a label map is trusted. Labels renamed or
+// deleted in Gmail are picked up after at most this long, or immediately
+// when a modify call fails.
+const labelCacheTTL = time.Hour
+
+type labelCacheEntry struct {
+	labels    map[string]string
+	fetchedAt time.Time
+}
+
+// labelCaches keeps each account's label name -> ID map between scans so a
+// scan only calls labels.list when a rule needs a label it has not seen.
+var labelCaches = struct {
+	sync.Mutex
+	m map[int64]labelCacheEntry
+}{m: make(map[int64]labelCacheEntry)}
+
+// accountLabels returns a name -> ID map containing every needed label,
+// listing (and creating missing) labels only on a cache miss. The returned
+// map must be treated as read-only.
+func accountLabels(ctx context.Context, svc *gmailpkg.Client, accountID int64, needed []string) (map[string]string, error) {
+	labelCaches.Lock()
+	entry, ok := labelCaches.m[accountID]
+	labelCaches.Unlock()
+	if ok && time.Since(entry.fetchedAt) < labelCacheTTL && hasAllLabels(entry.labels, needed) {
+		return entry.labels, nil
+	}
+
+	labels, err := gmailpkg.BuildLabelCache(ctx, svc, needed)
+	if err != nil {
+		return nil, err
+	}
+	labelCaches.Lock()
+	labelCaches.m[accountID] = labelCacheEntry{labels: labels, fetchedAt: time.Now()}
+	labelCaches.Unlock()
+	return labels, nil
+}
+
+// invalidateLabels drops the cached label map so the next scan re-lists.
+func invalidateLabels(accountID int64) {
+	labelCaches.Lock()
+	delete(labelCaches.m, accountID)
+	labelCaches.Unlock()
+}
+
+func hasAllLabels(labels map[string]string, needed []string) bool {
+	for _, name := range needed {
+		if _, ok := labels[name]; !ok {
+			return false
+		}
+	}
+	return true
+}
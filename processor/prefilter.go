@@ -0,0 +1,75 @@
+package processor
+
+import (
+	"log/slog"
+	"regexp"
+	"strconv"
+	"strings"
+
+	"github.com/sloccy/ollamail/db"
+	gmailpkg "github.com/sloccy/ollamail/gmail"
+)
+
+// CompilePrefilter compiles a rule's prefilter pattern. Matching is
+// case-insensitive. An empty pattern matches everything, so callers skip
+// rules without a prefilter instead of compiling one.
+func CompilePrefilter(pattern string) (*regexp.Regexp, error) {
+	return regexp.Compile("(?i)" + pattern)
+}
+
+// compilePrefilters compiles every prompt's prefilter once per scan. Invalid
+// patterns are logged and ignored so the rule falls back to the LLM alone.
+func compilePrefilters(prompts []db.Prompt) map[int64]*regexp.Regexp {
+	filters := make(map[int64]*regexp.Regexp)
+	for _, p := range prompts {
+		if strings.TrimSpace(p.Prefilter) == "" {
+			continue
+		}
+		re, err := CompilePrefilter(p.Prefilter)
+		if err != nil {
+			slog.Warn("invalid rule prefilter ignored", "rule", p.Name, "err", err)
+			continue
+		}
+		filters[p.ID] = re
+	}
+	return filters
+}
+
+// applyPrefilters decides what it can for msg without the LLM. A rule whose
+// prefilter does not match the sender, subject or body is decided false; a
+// rule whose prefilter matches and has no instructions is decided true. The
+// remaining prompts, in order, still need the LLM.
+func applyPrefilters(msg gmailpkg.Message, prompts []db.Prompt, filters map[int64]*regexp.Regexp) (decided map[int64]bool, remaining []db.Prompt) {
+	if len(filters) == 0 {
+		return nil, prompts
+	}
+	text := msg.Sender + "\n" + msg.Subject + "\n" + msg.Body
+	decided = make(map[int64]bool)
+	for _, p := range prompts {
+		re, ok := filters[p.ID]
+		if !ok {
+			remaining = append(remaining, p)
+			continue
+		}
+		switch {
+		case !re.MatchString(text):
+			decided[p.ID] = false
+		case strings.TrimSpace(p.Instructions) == "":
+			decided[p.ID] = true
+		default:
+			remaining = append(remaining, p)
+		}
+	}
+	return decided, remaining
+}
+
+// promptSetKey identifies a prompt subset so emails needing the same rules
+// can share one LLM call.
+func promptSetKey(prompts []db.Prompt) string {
+	var sb strings.Builder
+	for _, p := range prompts {
+		sb.WriteString(strconv.FormatInt(p.ID, 10))
+		sb.WriteByte(',')
+	}
+	return sb.String()
+}
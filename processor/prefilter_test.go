@@ -0,0 +1,114 @@
+package processor
+
+import (
+	"maps"
+	"slices"
+	"testing"
+
+	"github.com/sloccy/ollamail/db"
+	gmailpkg "github.com/sloccy/ollamail/gmail"
+)
+
+func TestCompilePrefilters(t *testing.T) {
+	tests := []struct {
+		name    string
+		prompts []db.Prompt
+		wantIDs []int64
+	}{
+		{
+			name:    "valid patterns compile",
+			prompts: []db.Prompt{{ID: 1, Prefilter: "invoice"}, {ID: 2, Prefilter: `^from: .*@bank\.com`}},
+			wantIDs: []int64{1, 2},
+		},
+		{
+			name:    "empty and blank patterns are skipped",
+			prompts: []db.Prompt{{ID: 1}, {ID: 2, Prefilter: "  "}, {ID: 3, Prefilter: "x"}},
+			wantIDs: []int64{3},
+		},
+		{
+			name:    "invalid pattern is ignored",
+			prompts: []db.Prompt{{ID: 1, Prefilter: "("}, {ID: 2, Prefilter: "ok"}},
+			wantIDs: []int64{2},
+		},
+	}
+
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			var got []int64
+			for id := range compilePrefilters(tc.prompts) {
+				got = append(got, id)
+			}
+			slices.Sort(got)
+			if !slices.Equal(got, tc.wantIDs) {
+				t.Errorf("compiled IDs = %v, want %v", got, tc.wantIDs)
+			}
+		})
+	}
+}
+
+func TestApplyPrefilters(t *testing.T) {
+	msg := gmailpkg.Message{Sender: "billing@shop.example", Subject: "Your INVOICE", Body: "Total due: 12.00"}
+	noFilter := db.Prompt{ID: 1, Instructions: "is it personal?"}
+	matchNoInstr := db.Prompt{ID: 2, Prefilter: "invoice"}
+	matchInstr := db.Prompt{ID: 3, Prefilter: `shop\.example`, Instructions: "is it a refund?"}
+	noMatch := db.Prompt{ID: 4, Prefilter: "newsletter", Instructions: "is it marketing?"}
+	bodyMatch := db.Prompt{ID: 5, Prefilter: `total due`}
+	invalid := db.Prompt{ID: 6, Prefilter: "[", Instructions: "anything?"}
+
+	tests := []struct {
+		name          string
+		prompts       []db.Prompt
+		wantDecided   map[int64]bool
+		wantRemaining []int64
+	}{
+		{
+			name:          "no prefilters leaves every rule to the LLM",
+			prompts:       []db.Prompt{noFilter},
+			wantRemaining: []int64{1},
+		},
+		{
+			name:        "match without instructions is decided true",
+			prompts:     []db.Prompt{matchNoInstr, bodyMatch},
+			wantDecided: map[int64]bool{2: true, 5: true},
+		},
+		{
+			name:          "match with instructions still needs the LLM",
+			prompts:       []db.Prompt{matchInstr},
+			wantDecided:   map[int64]bool{},
+			wantRemaining: []int64{3},
+		},
+		{
+			name:        "no match is decided false",
+			prompts:     []db.Prompt{noMatch},
+			wantDecided: map[int64]bool{4: false},
+		},
+		{
+			name:          "invalid pattern falls back to the LLM",
+			prompts:       []db.Prompt{invalid, matchNoInstr},
+			wantDecided:   map[int64]bool{2: true},
+			wantRemaining: []int64{6},
+		},
+		{
+			name:          "mixed keeps remaining order",
+			prompts:       []db.Prompt{matchInstr, noFilter, noMatch, matchNoInstr},
+			wantDecided:   map[int64]bool{4: false, 2: true},
+			wantRemaining: []int64{3, 1},
+		},
+	}
+
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			decided, remaining := applyPrefilters(msg, tc.prompts, compilePrefilters(tc.prompts))
+			if !maps.Equal(decided, tc.wantDecided) {
+				t.Errorf("decided = %v, want %v", decided, tc.wantDecided)
+			}
+			var ids []int64
+			for _, p := range remaining {
+				ids = append(ids, p.ID)
+			}
+			if !slices.Equal(ids, tc.wantRemaining) {
+				t.Errorf("remaining = %v, want %v", ids, tc.wantRemaining)
+			}
+		})
+	}
+}
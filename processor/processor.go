@@ -4,8 +4,10 @@ import (
 	"context"
 	"database/sql"
 	"encoding/json"
+	"errors"
 	"fmt"
 	"log/slog"
+	"slices"
 	"strings"
 
 	"github.com/sloccy/ollamail/db"
@@ -13,28 +15,19 @@ import (
 	"github.com/sloccy/ollamail/llm"
 )
 
-// EmailModify tracks label changes for a single message.
+// EmailModify tracks the combined label changes for a single message.
 type EmailModify struct {
 	MessageID    string
 	AddLabels    []string
 	RemoveLabels []string
 }
 
-// setupAccountContext loads OAuth config, creates a Gmail client, and filters
-// prompts for the given account. Shared by ProcessAccount and BackfillLlmDebug.
-func setupAccountContext(ctx context.Context, store *db.Store, gmailAuth *gmailpkg.Auth, account db.Account, allPrompts []db.Prompt) (*gmailpkg.Client, []db.Prompt, error) {
-	oauthCfg, err := gmailAuth.ConfigFromFile()
+// setupAccountContext returns the account's Gmail client and filters prompts
+// for it. Shared by ProcessAccount and BackfillLlmDebug.
+func setupAccountContext(store *db.Store, gmailAuth *gmailpkg.Auth, account db.Account, allPrompts []db.Prompt) (*gmailpkg.Client, []db.Prompt, error) {
+	svc, err := accountClient(store, gmailAuth, account)
 	if err != nil {
-		return nil, nil, fmt.Errorf("load oauth config: %w", err)
-	}
-	svc, err := gmailpkg.NewService(ctx, account.CredentialsJson, oauthCfg, func(newCreds string) {
-		_ = store.UpdateAccountCredentials(ctx, db.UpdateAccountCredentialsParams{
-			CredentialsJson: newCreds,
-			ID:              account.ID,
-		})
-	})
-	if err != nil {
-		return nil, nil, fmt.Errorf("create gmail service: %w", err)
+		return nil, nil, err
 	}
 	return svc, filterPrompts(allPrompts, account.ID), nil
 }
@@ -51,7 +44,7 @@ func marshalGmailDebug(msg gmailpkg.Message) string {
 // ProcessAccount processes all new emails for one account.
 // Returns the Gmail service so it can be reused by retention.
 func ProcessAccount(ctx context.Context, store *db.Store, ollamaClient *llm.Client, gmailAuth *gmailpkg.Auth, account db.Account, allPrompts []db.Prompt, cfg ProcessConfig) (*gmailpkg.ServiceWrapper, error) {
-	svc, prompts, err := setupAccountContext(ctx, store, gmailAuth, account, allPrompts)
+	svc, prompts, err := setupAccountContext(store, gmailAuth, account, allPrompts)
 	if err != nil {
 		return nil, err
 	}
@@ -61,8 +54,8 @@ func ProcessAccount(ctx context.Context, store *db.Store, ollamaClient *llm.Clie
 		return wrapper, nil
 	}
 
-	// List recent messages
-	messageIDs, err := gmailpkg.ListRecentMessageIDs(ctx, svc, cfg.LookbackHours, cfg.MaxResults)
+	// List new messages
+	messageIDs, historyID, err := listMessageIDs(ctx, svc, account, cfg)
 	if err != nil {
 		return wrapper, fmt.Errorf("list messages: %w", err)
 	}
@@ -75,9 +68,9 @@ func ProcessAccount(ctx context.Context, store *db.Store, ollamaClient *llm.Clie
 	if len(unprocessed) == 0 {
 		store.Log("INFO", fmt.Sprintf("[%s] No new emails to process.", account.Email))
 		_ = store.UpdateLastScan(ctx, account.ID)
+		saveHistoryID(ctx, store, account, historyID)
 		return wrapper, nil
 	}
-	store.Log("INFO", fmt.Sprintf("[%s] Processing %d new email(s) against %d rule(s).", account.Email, len(unprocessed), len(prompts)))
 
 	// Build label cache for all needed labels
 	var neededLabels []string
@@ -86,7 +79,7 @@ func ProcessAccount(ctx context.Context, store *db.Store, ollamaClient *llm.Clie
 			neededLabels = append(neededLabels, p.LabelName)
 		}
 	}
-	labelCache, err := gmailpkg.BuildLabelCache(ctx, svc, neededLabels)
+	labelCache, err := accountLabels(ctx, svc, account.ID, neededLabels)
 	if err != nil {
 		return wrapper, fmt.Errorf("build label cache: %w", err)
 	}
@@ -95,79 +88,136 @@ func ProcessAccount(ctx context.Context, store *db.Store, ollamaClient *llm.Clie
 	msgCh, errCh := gmailpkg.IterMessageDetails(ctx, svc, unprocessed, cfg.BodyTruncation)
 
 	var allModifies []gmailpkg.Modify
-	var trashIDs []string
-
+	results := []db.ProcessingResult{{Logs: []db.LogEntry{{
+		Timestamp: db.Now(),
+		Level:     "INFO",
+		Message:   fmt.Sprintf("[%s] Processing %d new email(s) against %d rule(s).", account.Email, len(unprocessed), len(prompts)),
+	}}}}
+
+	filters := compilePrefilters(prompts)
+
+	// Classify fetched messages in groups so several emails share one LLM call
+	var pending []gmailpkg.Message
+	// complete stays true while every message is fetched and classified
+	complete := true
+	classifyPending := func() {
+		classified := classifyMessages(ctx, store, ollamaClient, pending, prompts, filters)
+		for i, msg := range pending {
+			if classified[i].err != nil {
+				complete = false
+			}
+			mod, result := processEmail(account, msg, prompts, labelCache, cfg.DebugLogging, classified[i].result, classified[i].err)
+			result.LlmCache = classified[i].cache
+			results = append(results, result)
+			if len(mod.AddLabels) > 0 || len(mod.RemoveLabels) > 0 {
+				allModifies = append(allModifies, gmailpkg.Modify{
+					MessageIDs:   []string{mod.MessageID},
+					AddLabels:    mod.AddLabels,
+					RemoveLabels: mod.RemoveLabels,
+				})
+			}
+		}
+		pending = pending[:0]
+	}
 	for msg := range msgCh {
-		modifies, trash := processEmail(ctx, store, ollamaClient, account, msg, prompts, labelCache, cfg.DebugLogging)
-		for _, m := range modifies {
-			allModifies = append(allModifies, gmailpkg.Modify{
-				MessageIDs:   []string{m.MessageID},
-				AddLabels:    m.AddLabels,
-				RemoveLabels: m.RemoveLabels,
-			})
+		pending = append(pending, msg)
+		if len(pending) >= ollamaClient.BatchSize() {
+			classifyPending()
 		}
-		trashIDs = append(trashIDs, trash...)
+	}
+	if len(pending) > 0 {
+		classifyPending()
 	}
 	if err := <-errCh; err != nil {
 		slog.Error("fetch message details", "account", account.Email, "err", err)
+		complete = false
+	}
+
+	// Persist logs, history and processed markers for the whole scan at once
+	if err := store.SaveScanResults(ctx, account.ID, results); err != nil {
+		slog.Error("db write failed", "account", account.Email, "err", err)
+		complete = false
+	}
+	// Messages left for retry are not in the next history delta, so clear the
+	// history ID and let the next scan list the lookback window instead.
+	if !complete {
+		historyID = ""
 	}
+	saveHistoryID(ctx, store, account, historyID)
 
 	// Apply all Gmail modifications
 	if len(allModifies) > 0 {
 		if err := gmailpkg.BatchModifyEmails(ctx, svc, allModifies); err != nil {
 			slog.Error("batch modify failed", "account", account.Email, "err", err)
+			// A stale label ID is a likely cause; re-list labels next scan
+			invalidateLabels(account.ID)
 		}
 	}
-	if len(trashIDs) > 0 {
-		if err := gmailpkg.BatchTrashEmails(ctx, svc, trashIDs); err != nil {
-			slog.Error("batch trash failed", "account", account.Email, "err", err)
+	return wrapper, nil
+}
+
+// listMessageIDs returns the message IDs a scan should consider and the
+// history ID to record once they are handled. With a stored history ID only
+// inbox messages added since the last scan are listed; on the first scan, or
+// when Gmail's history window has expired, the lookback query is used.
+func listMessageIDs(ctx context.Context, svc *gmailpkg.Client, account db.Account, cfg ProcessConfig) ([]string, string, error) {
+	if account.LastHistoryID != "" {
+		ids, historyID, err := gmailpkg.ListHistoryMessageIDs(ctx, svc, account.LastHistoryID, cfg.MaxResults)
+		if !errors.Is(err, gmailpkg.ErrHistoryExpired) {
+			return ids, historyID, err
 		}
+		slog.Info("gmail history expired, listing by lookback", "account", account.Email)
 	}
 
-	// Update last scan timestamp
-	_ = store.UpdateLastScan(ctx, account.ID)
+	// Read the history ID before listing so nothing arriving in between is missed
+	historyID, err := gmailpkg.GetHistoryID(ctx, svc)
+	if err != nil {
+		slog.Warn("get gmail history ID", "account", account.Email, "err", err)
+	}
+	ids, err := gmailpkg.ListRecentMessageIDs(ctx, svc, cfg.LookbackHours, cfg.MaxResults)
+	if err != nil {
+		return nil, "", err
+	}
+	return ids, historyID, nil
+}
 
-	return wrapper, nil
+func saveHistoryID(ctx context.Context, store *db.Store, account db.Account, historyID string) {
+	if historyID == account.LastHistoryID {
+		return
+	}
+	if err := store.UpdateAccountHistoryID(ctx, db.UpdateAccountHistoryIDParams{
+		LastHistoryID: historyID,
+		ID:            account.ID,
+	}); err != nil {
+		slog.Error("save history ID", "account", account.Email, "err", err)
+	}
 }
 
+// processEmail turns one message's classification into the Gmail changes to
+// apply and the rows to persist; nothing is written to the database here.
 func processEmail(
-	ctx context.Context,
-	store *db.Store,
-	ollamaClient *llm.Client,
 	account db.Account,
 	msg gmailpkg.Message,
 	prompts []db.Prompt,
 	labelCache map[string]string,
 	debugLogging bool,
-) (modifies []EmailModify, trashIDs []string) {
-	llmPrompts := make([]llm.Prompt, len(prompts))
-	for i, p := range prompts {
-		llmPrompts[i] = llm.Prompt{ID: p.ID, Name: p.Name, Instructions: p.Instructions}
-	}
-
-	email := llm.Email{
-		Sender:  msg.Sender,
-		Subject: msg.Subject,
-		Body:    msg.Body,
-		Snippet: msg.Snippet,
-	}
+	classified llm.ClassifyResult,
+	llmErr error,
+) (mod EmailModify, result db.ProcessingResult) {
+	// Label changes from every matched rule are merged into a single modify
+	mod = EmailModify{MessageID: msg.ID}
+	var logs []db.LogEntry
+	var history []db.HistoryEntry
 
-	store.Log("INFO", fmt.Sprintf("[%s] Classifying: '%s' from %s",
-		account.Email, gmailpkg.Truncate(msg.Subject, 60), gmailpkg.Truncate(msg.Sender, 60)))
+	logs = append(logs, db.LogEntry{Timestamp: db.Now(), Level: "INFO", Message: fmt.Sprintf("[%s] Classifying: '%s' from %s",
+		account.Email, gmailpkg.Truncate(msg.Subject, 60), gmailpkg.Truncate(msg.Sender, 60))})
 
 	gmailRaw := marshalGmailDebug(msg)
-
-	classified, llmErr := ollamaClient.ClassifyEmailBatch(ctx, store, email, llmPrompts)
-
-	var logs []db.LogEntry
-	var history []db.HistoryEntry
+	logs = append(logs, classified.Logs...)
 
 	if llmErr != nil {
-		logs = append(logs, db.LogEntry{Level: "WARNING", Message: fmt.Sprintf("LLM error for %q: %v — will retry", msg.Subject, llmErr)})
-		if err := store.BatchInsertProcessingResults(ctx, logs, nil, account.ID, ""); err != nil {
-			slog.Error("db log write failed", "err", err)
-		}
-		return nil, nil // Don't mark processed; will retry
+		logs = append(logs, db.LogEntry{Timestamp: db.Now(), Level: "WARNING", Message: fmt.Sprintf("LLM error for %q: %v — will retry", msg.Subject, llmErr)})
+		return mod, db.ProcessingResult{Logs: logs} // Don't mark processed; will retry
 	}
 
 	var matched []string
@@ -177,9 +227,9 @@ func processEmail(
 		}
 	}
 	if len(matched) > 0 {
-		store.Log("INFO", fmt.Sprintf("[%s] Classification done: %d match(es): %v", account.Email, len(matched), matched))
+		logs = append(logs, db.LogEntry{Timestamp: db.Now(), Level: "INFO", Message: fmt.Sprintf("[%s] Classification done: %d match(es): %v", account.Email, len(matched), matched)})
 	} else {
-		store.Log("INFO", fmt.Sprintf("[%s] Classification done: 0 match(es): none", account.Email))
+		logs = append(logs, db.LogEntry{Timestamp: db.Now(), Level: "INFO", Message: fmt.Sprintf("[%s] Classification done: 0 match(es): none", account.Email)})
 	}
 
 	stop := false
@@ -197,8 +247,6 @@ func processEmail(
 			actions = append(actions, "labeled → "+p.LabelName)
 		}
 
-		mod := EmailModify{MessageID: msg.ID}
-
 		// Apply label
 		if p.LabelName != "" {
 			if labelID, ok := labelCache[p.LabelName]; ok {
@@ -213,7 +261,8 @@ func processEmail(
 			mod.RemoveLabels = append(mod.RemoveLabels, gmailpkg.LabelInbox)
 			actions = append(actions, "sent to spam")
 		case p.ActionTrash != 0:
-			trashIDs = append(trashIDs, msg.ID)
+			mod.AddLabels = append(mod.AddLabels, gmailpkg.LabelTrash)
+			mod.RemoveLabels = append(mod.RemoveLabels, gmailpkg.LabelInbox)
 			actions = append(actions, "trashed")
 		case p.ActionArchive != 0:
 			mod.RemoveLabels = append(mod.RemoveLabels, gmailpkg.LabelInbox)
@@ -230,13 +279,10 @@ func processEmail(
 			stop = true
 		}
 
-		if len(mod.AddLabels) > 0 || len(mod.RemoveLabels) > 0 {
-			modifies = append(modifies, mod)
-		}
-
 		logs = append(logs, db.LogEntry{
-			Level:   "INFO",
-			Message: fmt.Sprintf("[%s] '%s' \u2014 %s (rule: %s)", account.Email, gmailpkg.Truncate(msg.Subject, 60), strings.Join(actions, ", "), p.Name),
+			Timestamp: db.Now(),
+			Level:     "INFO",
+			Message:   fmt.Sprintf("[%s] '%s' \u2014 %s (rule: %s)", account.Email, gmailpkg.Truncate(msg.Subject, 60), strings.Join(actions, ", "), p.Name),
 		})
 		history = append(history, db.HistoryEntry{
 			AccountID:    account.ID,
@@ -252,6 +298,11 @@ func processEmail(
 		})
 	}
 
+	// Spam wins over trash when different rules ask for both
+	if slices.Contains(mod.AddLabels, gmailpkg.LabelSpam) {
+		mod.AddLabels = slices.DeleteFunc(mod.AddLabels, func(l string) bool { return l == gmailpkg.LabelTrash })
+	}
+
 	// If no prompts matched, record a "no match" entry
 	if len(history) == 0 {
 		history = append(history, db.HistoryEntry{
@@ -265,30 +316,30 @@ func processEmail(
 		})
 	}
 
-	logs = append(logs, db.LogEntry{Level: "INFO", Message: fmt.Sprintf("Processed %q", msg.Subject)})
+	logs = append(logs, db.LogEntry{Timestamp: db.Now(), Level: "INFO", Message: fmt.Sprintf("Processed %q", msg.Subject)})
 	if debugLogging {
-		logs = append(logs, db.LogEntry{Level: "DEBUG", Message: "LLM response: " + classified.RawResponse})
+		logs = append(logs, db.LogEntry{Timestamp: db.Now(), Level: "DEBUG", Message: "LLM response: " + classified.RawResponse})
 	}
 
-	if err := store.BatchInsertProcessingResults(ctx, logs, history, account.ID, msg.ID); err != nil {
-		slog.Error("db write failed", "err", err)
-		// Don't return error — email is processed, don't retry
+	result = db.ProcessingResult{
+		Logs:      logs,
+		History:   history,
+		MessageID: msg.ID,
 	}
-
-	if err := store.RecordLlmDebug(ctx, db.AddLlmDebugParams{
-		AccountID:    account.ID,
-		AccountEmail: account.Email,
-		MessageID:    msg.ID,
-		Subject:      msg.Subject,
-		Sender:       msg.Sender,
-		GmailRaw:     gmailRaw,
-		LlmRequest:   classified.RequestJSON,
-		LlmResponse:  classified.RawResponse,
-	}); err != nil {
-		slog.Error("llm debug write failed", "err", err)
+	// Emails decided entirely by prefilters never reached the LLM
+	if classified.RequestJSON != "" {
+		result.LlmDebug = &db.AddLlmDebugParams{
+			AccountID:    account.ID,
+			AccountEmail: account.Email,
+			MessageID:    msg.ID,
+			Subject:      msg.Subject,
+			Sender:       msg.Sender,
+			GmailRaw:     gmailRaw,
+			LlmRequest:   classified.RequestJSON,
+			LlmResponse:  classified.RawResponse,
+		}
 	}
-
-	return modifies, trashIDs
+	return mod, result
 }
 
 func filterPrompts(prompts []db.Prompt, accountID int64) []db.Prompt {
@@ -1,6 +1,7 @@
 package main
 
 import (
+	"bytes"
 	"compress/gzip"
 	"context"
 	"crypto/rand"
@@ -28,6 +29,7 @@ import (
 	"github.com/sloccy/ollamail/gmail"
 	"github.com/sloccy/ollamail/llm"
 	"github.com/sloccy/ollamail/poller"
+	"github.com/sloccy/ollamail/processor"
 )
 
 //go:embed static
@@ -87,6 +89,13 @@ func newServer(ctx context.Context, store *db.Store, ollamaClient *llm.Client, p
 
 const maxBodySize = 10 << 20 // 10 MB
 
+// logStreamKeepAlive is how often an idle log stream sends a comment line,
+// and logStreamPage how many entries go into one event.
+const (
+	logStreamKeepAlive = 30 * time.Second
+	logStreamPage      = 100
+)
+
 var gzipPool = sync.Pool{
 	New: func() any {
 		return gzip.NewWriter(io.Discard)
@@ -208,6 +217,7 @@ func (s *server) registerRoutes() {
 	s.mux.HandleFunc("GET /api/config/export", s.handleExportConfig)
 	s.mux.HandleFunc("POST /api/config/import", s.handleImportConfig)
 	s.mux.HandleFunc("GET /api/logs/download", s.handleDownloadLogs)
+	s.mux.HandleFunc("GET /api/logs/stream", s.handleLogsStream)
 	s.mux.HandleFunc("GET /api/prompts/generate-stream", s.handleGenerateStream)
 }
 
@@ -308,7 +318,10 @@ func (s *server) handleToggleAccount(w http.ResponseWriter, r *http.Request) {
 		return
 	}
 	ctx := r.Context()
-	_, _ = s.store.ToggleAccount(ctx, id)
+	if _, err := s.store.ToggleAccount(ctx, id); err != nil {
+		http.Error(w, "not found", http.StatusNotFound)
+		return
+	}
 	s.handleAccounts(w, r)
 }
 
@@ -320,6 +333,7 @@ func (s *server) handleDeleteAccount(w http.ResponseWriter, r *http.Request) {
 	}
 	ctx := r.Context()
 	_ = s.store.DeleteAccountCascade(ctx, id)
+	processor.ForgetAccount(id)
 	s.handleAccounts(w, r)
 }
 
@@ -341,6 +355,7 @@ type promptView struct {
 	StopProcessing bool
 	AccountID      int64
 	AccountEmail   string
+	Prefilter      string
 }
 
 type promptEditView struct {
@@ -385,10 +400,17 @@ func (s *server) handleCreatePrompt(w http.ResponseWriter, r *http.Request) {
 	name := strings.TrimSpace(r.FormValue("name"))
 	labelName := strings.TrimSpace(r.FormValue("label_name"))
 	instructions := strings.TrimSpace(r.FormValue("instructions"))
+	prefilter := strings.TrimSpace(r.FormValue("prefilter"))
 	if name == "" {
 		s.fragmentResponse(w, "templates/fragments/prompts_list.html", nil, "Name is required")
 		return
 	}
+	if prefilter != "" {
+		if _, err := processor.CompilePrefilter(prefilter); err != nil {
+			s.fragmentResponse(w, "templates/fragments/prompts_list.html", nil, "Invalid prefilter pattern")
+			return
+		}
+	}
 
 	var accountID sql.NullInt64
 	if v := r.FormValue("account_id"); v != "" {
@@ -415,6 +437,7 @@ func (s *server) handleCreatePrompt(w http.ResponseWriter, r *http.Request) {
 		SortOrder:      maxOrder + 1,
 		StopProcessing: boolToInt(r.FormValue("stop_processing") == "1"),
 		AccountID:      accountID,
+		Prefilter:      prefilter,
 	})
 	if err != nil {
 		slog.Error("create prompt", "err", err)
@@ -445,6 +468,14 @@ func (s *server) handleUpdatePrompt(w http.ResponseWriter, r *http.Request) {
 		}
 	}
 	labelName := strings.TrimSpace(r.FormValue("label_name"))
+	prefilter := strings.TrimSpace(r.FormValue("prefilter"))
+	if prefilter != "" {
+		if _, err := processor.CompilePrefilter(prefilter); err != nil {
+			views, _ := s.getPromptViews(ctx, "")
+			s.fragmentResponse(w, "templates/fragments/prompts_list.html", views, "Invalid prefilter pattern")
+			return
+		}
+	}
 
 	_ = s.store.UpdatePrompt(ctx, db.UpdatePromptParams{
 		Name:           strings.TrimSpace(r.FormValue("name")),
@@ -456,6 +487,7 @@ func (s *server) handleUpdatePrompt(w http.ResponseWriter, r *http.Request) {
 		ActionMarkRead: boolToInt(r.FormValue("action_mark_read") == "1"),
 		StopProcessing: boolToInt(r.FormValue("stop_processing") == "1"),
 		AccountID:      accountID,
+		Prefilter:      prefilter,
 		ID:             id,
 	})
 
@@ -476,7 +508,10 @@ func (s *server) handleDeletePrompt(w http.ResponseWriter, r *http.Request) {
 func (s *server) handleTogglePrompt(w http.ResponseWriter, r *http.Request) {
 	id := pathInt(r, "id")
 	ctx := r.Context()
-	_, _ = s.store.TogglePrompt(ctx, id)
+	if _, err := s.store.TogglePrompt(ctx, id); err != nil {
+		http.Error(w, "not found", http.StatusNotFound)
+		return
+	}
 
 	p, err := s.store.GetPrompt(ctx, id)
 	if err != nil {
@@ -551,6 +586,7 @@ func dbPromptToView(p db.Prompt, accountMap map[int64]string) promptView {
 		ActionTrash:    p.ActionTrash != 0,
 		ActionMarkRead: p.ActionMarkRead != 0,
 		StopProcessing: p.StopProcessing != 0,
+		Prefilter:      p.Prefilter,
 	}
 	if p.AccountID.Valid {
 		pv.AccountID = p.AccountID.Int64
@@ -604,6 +640,76 @@ func (s *server) handleLogs(w http.ResponseWriter, r *http.Request) {
 	s.fragmentResponseNamed(w, "logs_list", logs)
 }
 
+// handleLogsStream pushes log entries newer than ?after= as rendered
+// "log_items" HTML, one server-sent event per batch committed by the store.
+func (s *server) handleLogsStream(w http.ResponseWriter, r *http.Request) {
+	after, _ := strconv.ParseInt(r.URL.Query().Get("after"), 10, 64)
+	// A reconnecting EventSource resumes from the last id it saw.
+	if id, err := strconv.ParseInt(r.Header.Get("Last-Event-Id"), 10, 64); err == nil {
+		after = id
+	}
+
+	w.Header().Set("Content-Type", "text/event-stream")
+	w.Header().Set("Cache-Control", "no-cache")
+	w.Header().Set("X-Accel-Buffering", "no")
+
+	flusher, ok := w.(http.Flusher)
+	if !ok {
+		http.Error(w, "streaming not supported", http.StatusInternalServerError)
+		return
+	}
+
+	notify, unsubscribe := s.store.SubscribeLogs()
+	defer unsubscribe()
+
+	ctx := r.Context()
+	var buf bytes.Buffer
+	for {
+		// Page oldest-first until caught up, so a burst larger than one
+		// page is still streamed in full.
+		sent := false
+		for {
+			logs, err := s.store.GetLogsSince(ctx, db.GetLogsSinceParams{ID: after, Limit: logStreamPage})
+			if err != nil {
+				return
+			}
+			if len(logs) == 0 {
+				break
+			}
+			after = logs[len(logs)-1].ID
+			slices.Reverse(logs) // the page shows newest first
+			buf.Reset()
+			if err := s.tmpl.ExecuteTemplate(&buf, "log_items", logs); err != nil {
+				slog.Error("render template", "name", "log_items", "err", err)
+				return
+			}
+			_, _ = fmt.Fprintf(w, "id: %d\n", after)
+			for line := range strings.SplitSeq(strings.TrimSpace(buf.String()), "\n") {
+				_, _ = fmt.Fprintf(w, "data: %s\n", line)
+			}
+			_, _ = io.WriteString(w, "\n")
+			sent = true
+			if len(logs) < logStreamPage {
+				break
+			}
+		}
+		if !sent {
+			// Comment line: keeps proxies from timing out an idle stream.
+			_, _ = io.WriteString(w, ": ping\n\n")
+		}
+		flusher.Flush()
+
+		select {
+		case <-notify:
+		case <-time.After(logStreamKeepAlive):
+		case <-ctx.Done():
+			return
+		case <-s.ctx.Done():
+			return
+		}
+	}
+}
+
 // ============================================================
 // History
 // ============================================================
@@ -927,8 +1033,9 @@ func (s *server) handleOAuthExchange(w http.ResponseWriter, r *http.Request) {
 		s.fragmentResponse(w, "templates/fragments/accounts_list.html", nil, "Invalid URL")
 		return
 	}
-	code := parsed.Query().Get("code")
-	state := parsed.Query().Get("state")
+	query := parsed.Query()
+	code := query.Get("code")
+	state := query.Get("state")
 
 	s.oauthMu.Lock()
 	exp, ok := s.oauthState[state]
@@ -949,9 +1056,11 @@ func (s *server) handleOAuthExchange(w http.ResponseWriter, r *http.Request) {
 		return
 	}
 
-	_, err = s.store.UpsertAccount(ctx, db.UpsertAccountParams{Email: emailAddr, CredentialsJson: credJSON})
+	accountID, err := s.store.UpsertAccount(ctx, db.UpsertAccountParams{Email: emailAddr, CredentialsJson: credJSON})
 	if err != nil {
 		slog.Error("upsert account", "err", err)
+	} else {
+		processor.ForgetAccount(accountID)
 	}
 
 	s.handleAccounts(w, r)
@@ -1025,10 +1134,10 @@ func (s *server) handleExportPrompts(w http.ResponseWriter, r *http.Request) {
 }
 
 type configExport struct {
-	Accounts  []db.Account       `json:"accounts"`
-	Prompts   []db.Prompt        `json:"prompts"`
-	Settings  []db.Setting       `json:"settings"`
-	Retention []accountRetExport `json:"retention"`
+	Accounts  []db.ListAccountsSafeRow `json:"accounts"`
+	Prompts   []db.Prompt              `json:"prompts"`
+	Settings  []db.Setting             `json:"settings"`
+	Retention []accountRetExport       `json:"retention"`
 }
 
 type accountRetExport struct {
@@ -1040,7 +1149,7 @@ type accountRetExport struct {
 
 func (s *server) handleExportConfig(w http.ResponseWriter, r *http.Request) {
 	ctx := r.Context()
-	accounts, _ := s.store.ListAccounts(ctx)
+	accounts, _ := s.store.ListAccountsSafe(ctx)
 	prompts, _ := s.store.ListPrompts(ctx)
 	allSettings, _ := s.store.GetAllSettings(ctx)
 	var settings []db.Setting
@@ -1051,13 +1160,6 @@ func (s *server) handleExportConfig(w http.ResponseWriter, r *http.Request) {
 		settings = append(settings, setting)
 	}
 
-	// Strip credentials from export
-	safeAccounts := make([]db.Account, len(accounts))
-	for i, a := range accounts {
-		a.CredentialsJson = ""
-		safeAccounts[i] = a
-	}
-
 	retentions := make([]accountRetExport, 0, len(accounts))
 	for _, a := range accounts {
 		entry := accountRetExport{AccountEmail: a.Email}
@@ -1073,7 +1175,7 @@ func (s *server) handleExportConfig(w http.ResponseWriter, r *http.Request) {
 	w.Header().Set("Content-Disposition", "attachment; filename=ollamail-config.json")
 	w.Header().Set("Content-Type", "application/json")
 	_ = json.NewEncoder(w).Encode(configExport{ //nolint:musttag,errchkjson // sqlc-generated struct; HTTP write error is unrecoverable
-		Accounts:  safeAccounts,
+		Accounts:  accounts,
 		Prompts:   prompts,
 		Settings:  settings,
 		Retention: retentions,
@@ -1113,6 +1215,7 @@ func (s *server) handleImportConfig(w http.ResponseWriter, r *http.Request) {
 			SortOrder:      p.SortOrder,
 			StopProcessing: p.StopProcessing,
 			AccountID:      p.AccountID,
+			Prefilter:      p.Prefilter,
 		})
 		imported++
 	}
@@ -1140,7 +1243,7 @@ func (s *server) handleDownloadLogs(w http.ResponseWriter, r *http.Request) {
 		end = strings.Replace(end, "T", " ", 1) + ":00"
 		logs, _ = s.store.GetLogsRange(ctx, db.GetLogsRangeParams{Timestamp: start, Timestamp_2: end})
 	} else {
-		logs, _ = s.store.GetLogs(ctx, 10000)
+		logs, _ = s.store.Queries.GetLogs(ctx, 10000) // bypass the page cache for bulk exports
 	}
 
 	w.Header().Set("Content-Type", "text/csv")
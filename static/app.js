@@ -41,6 +41,7 @@ function setActivePage(page, el) {
   document.getElementById('page-' + page).classList.add('active');
   if (el) el.classList.add('active');
   if (location.hash !== '#' + page) history.replaceState(null, '', '#' + page);
+  _syncLogStream(page);
   closeSidebar();
 }
 
@@ -304,6 +305,49 @@ document.body.addEventListener('htmx:afterSwap', function(e) {
   document.getElementById('pollerLabel').textContent = running ? 'running' : 'stopped';
 });
 
+// ---- Live logs (server-sent events) ----
+let _logStream = null;
+let _logsLoaded = false;
+
+// Only the visible logs page keeps a stream open; coming back reloads the
+// list, which reopens the stream from its newest entry.
+function _syncLogStream(page) {
+  if (page === 'logs') {
+    if (!_logStream && _logsLoaded) {
+      htmx.ajax('GET', '/fragments/logs', { target: '#logs-content', swap: 'innerHTML' });
+    }
+    return;
+  }
+  if (_logStream) {
+    _logStream.close();
+    _logStream = null;
+  }
+}
+
+document.body.addEventListener('htmx:afterSwap', function(e) {
+  if (e.detail.target.id !== 'logs-content') return;
+  _logsLoaded = true;
+  if (_logStream) _logStream.close();
+  if (!document.getElementById('page-logs').classList.contains('active')) {
+    _logStream = null;
+    return;
+  }
+  const list = e.detail.target.querySelector('ul.timeline');
+  const after = list ? list.dataset.lastId : '0';
+  _logStream = new EventSource('/api/logs/stream?after=' + encodeURIComponent(after));
+  _logStream.onmessage = function(ev) {
+    const content = document.getElementById('logs-content');
+    let ul = content.querySelector('ul.timeline');
+    if (!ul) {
+      ul = document.createElement('ul');
+      ul.className = 'timeline';
+      content.replaceChildren(ul);
+    }
+    ul.insertAdjacentHTML('afterbegin', ev.data);
+    while (ul.children.length > 100) ul.lastElementChild.remove();
+  };
+});
+
 // ---- Hx-Trigger event handlers ----
 document.body.addEventListener('showToast', function(e) {
   const { message, type } = e.detail || {};